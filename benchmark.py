@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import matplotlib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.tree import DecisionTreeRegressor
+from sklearn.ensemble import RandomForestRegressor
+from get_dataset import get_dataset_excel
+from find_and_replace import find_and_replace
+from handle_missing_data import replace_with_nan
+from clean_dataset import clean_dataset
+from check_for_duplicates import check_for_duplicates
+from get_pga_scatterplot import get_pga_scatterplot
+from get_p_pos_boxplot import get_p_pos_boxplot
+from get_p_histogram import get_p_histogram
+
+# Columns of the NHL Summary report, in order.
+SUMMARY_COLUMNS = ["Player", "S/C", "Pos", "GP", "G", "A", "P", "+/-", "PIM", "P/GP", "EVG", "EVP", "PPG", "PPP",
+                   "SHG", "SHP", "OTG", "GWG", "S", "S%", "TOI/GP", "FOW%"]
+
+# Proportion of '--' entries per column, per the missing_count of the real dataset.
+MISSING_RATES = {"S/C": 0.01, "EVG": 0.036, "EVP": 0.036, "PPG": 0.036, "PPP": 0.036, "SHG": 0.036, "SHP": 0.036,
+                 "S": 0.14, "S%": 0.2, "TOI/GP": 0.58, "FOW%": 0.63}
+
+
+def format_thousands(values):
+    """Format integer array as the Excel export does - int below 1000, and '1,234' string from 1000."""
+    values = pd.Series(values, dtype="object")
+    large = values >= 1000
+    values[large] = values[large].map("{:,}".format)
+
+    return values
+
+
+def generate_players(n_rows, SEED=1):
+    """Generate a synthetic raw player table with the schema of the NHL Summary report.
+
+    Values follow the rough shape of the real data - many short careers and few long ones - and are formatted as
+    compiled by get_dataset_excel(), with '--' for missing values and ',' thousands separators. Returns DataFrame.
+    """
+    rng = np.random.default_rng(SEED)
+
+    games_played = np.minimum(rng.geometric(1 / 275, n_rows), 1800)
+    goals = rng.binomial(games_played, rng.beta(2, 12, n_rows))
+    assists = rng.binomial(games_played, rng.beta(2, 8, n_rows))
+    shots = goals + rng.poisson(games_played * rng.uniform(0.5, 2.5, n_rows))
+    power_play_goals = rng.binomial(goals, 0.2)
+    short_handed_goals = rng.binomial(goals - power_play_goals, 0.05)
+
+    df = pd.DataFrame({"Player": [f"Player {i}" for i in range(n_rows)],
+                       "S/C": rng.choice(["L", "R"], n_rows, p=[0.6, 0.4]),
+                       "Pos": rng.choice(["C", "L", "R", "D"], n_rows, p=[0.25, 0.2, 0.2, 0.35]),
+                       "GP": format_thousands(games_played),
+                       "G": goals,
+                       "A": format_thousands(assists),
+                       "P": format_thousands(goals + assists),
+                       "+/-": rng.normal(0, 50, n_rows).astype("int64"),
+                       "PIM": format_thousands(rng.binomial(games_played, 0.8)),
+                       "P/GP": np.round((goals + assists) / games_played, 2),
+                       "EVG": format_thousands(goals - power_play_goals - short_handed_goals),
+                       "EVP": format_thousands(goals + assists - power_play_goals - short_handed_goals),
+                       "PPG": format_thousands(power_play_goals),
+                       "PPP": format_thousands(power_play_goals * 2),
+                       "SHG": format_thousands(short_handed_goals),
+                       "SHP": format_thousands(short_handed_goals * 2),
+                       "OTG": rng.binomial(goals, 0.01),
+                       "GWG": rng.binomial(goals, 0.15),
+                       "S": format_thousands(shots),
+                       "S%": np.round(np.where(shots > 0, goals / np.maximum(shots, 1) * 100, 0), 1),
+                       "TOI/GP": [f"{m}:{s:02d}" for m, s in zip(rng.integers(5, 25, n_rows),
+                                                                  rng.integers(0, 60, n_rows))],
+                       "FOW%": np.round(rng.uniform(30, 60, n_rows), 1)})
+
+    for col, rate in MISSING_RATES.items():
+        df[col] = df[col].astype("object")
+        df.loc[rng.random(n_rows) < rate, col] = "--"
+
+    return df[SUMMARY_COLUMNS]
+
+
+def write_excel_files(df, directory, rows_per_file=100, report="Summary"):
+    """Write DataFrame to Excel files of rows_per_file rows, named as the NHL.com downloads."""
+    for i, start in enumerate(range(0, len(df), rows_per_file)):
+        df.iloc[start:start + rows_per_file].to_excel(f"{directory}/{report}-{i + 1:02d}.xlsx", index=False)
+
+
+def time_function(function, repeat=3):
+    """Time function call, returning the best wall time of repeat runs, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def get_git_commit():
+    """Get current git commit hash, or None outside a git repository."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes, repeat=3, max_excel_rows=10000, max_fit_rows=100000, max_plot_rows=1000000, SEED=1):
+    """Time pipeline functions on synthetic datasets of each size.
+
+    Excel ingestion, model fits and plots are slower than the other steps, and only run up to their maximum sizes.
+    Returns list of dicts of benchmark, rows and best time in seconds.
+    """
+    matplotlib.use("Agg")
+    results = []
+
+    def record(name, n_rows, function):
+        seconds = time_function(function, repeat)
+        results.append({"benchmark": name, "rows": n_rows, "seconds": round(seconds, 6)})
+        print(f"{name} - {n_rows} rows: {seconds:.4f}s\n")
+
+    for n_rows in sizes:
+        df_raw = generate_players(n_rows, SEED)
+        df_clean, null_count = clean_dataset(df_raw)
+
+        if n_rows <= max_excel_rows:
+            with tempfile.TemporaryDirectory() as directory:
+                write_excel_files(df_raw, directory)
+                record("get_dataset_excel", n_rows, lambda: get_dataset_excel(directory))
+                record("get_dataset_excel_parallel", n_rows, lambda: get_dataset_excel(directory, parallel=True))
+
+        record("find_and_replace", n_rows, lambda: find_and_replace(df_raw, r"(\d),(\d)(\d)(\d)", r"\1\2\3\4"))
+        record("replace_with_nan", n_rows, lambda: replace_with_nan(df_raw))
+        record("clean_dataset", n_rows, lambda: clean_dataset(df_raw))
+        record("check_for_duplicates", n_rows, lambda: check_for_duplicates(df_clean))
+        record("check_for_duplicates_fingerprint", n_rows, lambda: check_for_duplicates(df_clean, fingerprint=True))
+
+        if n_rows <= max_fit_rows:
+            X = df_clean.drop(["G", "Player", "S/C", "Pos"], axis=1).to_numpy(dtype="float64")
+            y = df_clean["G"].to_numpy()
+            record("DecisionTreeRegressor.fit", n_rows,
+                   lambda: DecisionTreeRegressor(max_depth=4, min_samples_leaf=0.14, random_state=SEED).fit(X, y))
+            record("RandomForestRegressor.fit", n_rows,
+                   lambda: RandomForestRegressor(n_estimators=400, min_samples_leaf=0.12, random_state=SEED,
+                                                 n_jobs=-1).fit(X, y))
+
+        if n_rows <= max_plot_rows:
+            # Plot functions save to the working directory.
+            cwd = os.getcwd()
+            with tempfile.TemporaryDirectory() as directory:
+                os.chdir(directory)
+                try:
+                    for plot_function in [get_pga_scatterplot, get_p_pos_boxplot, get_p_histogram]:
+                        record(plot_function.__name__, n_rows, lambda: plot_function(df_clean, show=False))
+                finally:
+                    os.chdir(cwd)
+
+    return results
+
+
+def save_benchmarks(results, output_dir="./Benchmarks/"):
+    """Save benchmark results to timestamped JSON file, with versions and git commit for comparison between runs."""
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json")
+
+    with open(output_file, "w") as out_file:
+        json.dump({"git_commit": get_git_commit(),
+                   "python": platform.python_version(),
+                   "pandas": pd.__version__,
+                   "numpy": np.__version__,
+                   "sklearn": sklearn.__version__,
+                   "cpu_count": os.cpu_count(),
+                   "results": results}, out_file, indent=2)
+
+    print(f"Saving benchmark results to {output_file}...\n")
+
+    return output_file
+
+
+def compare_benchmarks(baseline_file, new_file):
+    """Compare two saved benchmark runs. Returns DataFrame of times per benchmark and size, and new/baseline ratio."""
+    times = []
+    for label, file in [("baseline", baseline_file), ("new", new_file)]:
+        with open(file) as in_file:
+            df = pd.DataFrame(json.load(in_file)["results"])
+        times.append(df.set_index(["benchmark", "rows"])["seconds"].rename(label))
+
+    df_comparison = pd.concat(times, axis=1)
+    df_comparison["ratio"] = df_comparison["new"] / df_comparison["baseline"]
+
+    return df_comparison
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark pipeline functions on synthetic NHL player data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="rows per dataset")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, best time is kept")
+    parser.add_argument("--max-excel-rows", type=int, default=10000)
+    parser.add_argument("--max-fit-rows", type=int, default=100000)
+    parser.add_argument("--max-plot-rows", type=int, default=1000000)
+    parser.add_argument("--compare", help="saved benchmark file to compare the new results against")
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmarks(args.sizes, args.repeat, args.max_excel_rows, args.max_fit_rows,
+                                       args.max_plot_rows)
+    benchmark_file = save_benchmarks(benchmark_results)
+
+    if args.compare:
+        print("Comparing with baseline...\n", compare_benchmarks(args.compare, benchmark_file), "\n")
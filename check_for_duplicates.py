@@ -1,21 +1,108 @@
+import os
 import pandas as pd
+import numpy as np
+from glob import glob
+from pandas.api.types import is_numeric_dtype
 
+# Fingerprint shards kept before they are merged into one.
+MAX_FINGERPRINT_SHARDS = 16
 
-def check_for_duplicates(df):
+
+def get_row_fingerprints(df):
+    """Hash each row of DataFrame to a uint64 fingerprint.
+
+    Numeric columns are hashed as float64, so that a row has the same fingerprint whether its columns were read as
+    integer or float. Returns numpy array of fingerprints, in row order.
+    """
+    df = df.astype({col: "float64" for col in df.columns if is_numeric_dtype(df[col])})
+
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def check_for_duplicates(df, fingerprint=False):
     """Check DataFrame for duplicate rows.
 
-    Prints any duplicates found, and returns dataframe with duplicates dropped.
+    Prints any duplicates found, and returns dataframe with duplicates dropped. If fingerprint is True, each row is
+    hashed once with get_row_fingerprints(), and the fingerprints are used both to find and to drop duplicates.
     """
     print("Checking for duplicates...\n")
-    df_duplicates = df[df.duplicated()]
+    if fingerprint:
+        fingerprints = pd.Series(get_row_fingerprints(df))
+        df_duplicates = df[fingerprints.duplicated().to_numpy()]
+    else:
+        df_duplicates = df[df.duplicated()]
 
     print("Getting duplicates...\n", df_duplicates, "\n")
 
-    df = df.drop_duplicates(keep='last')
+    if fingerprint:
+        df = df[~fingerprints.duplicated(keep='last').to_numpy()]
+    else:
+        df = df.drop_duplicates(keep='last')
 
     return df
 
 
+def is_fingerprint_in_shards(fingerprints, shards):
+    """Check which fingerprints are in any of a list of sorted, unique fingerprint arrays (shards).
+
+    Each shard is binary searched, so only O(log n) values of a shard are read per fingerprint - shards may be
+    memory-mapped files. Returns boolean numpy array, in order of fingerprints.
+    """
+    is_stored = np.zeros(len(fingerprints), dtype=bool)
+    for shard in shards:
+        if len(shard):
+            positions = np.minimum(np.searchsorted(shard, fingerprints), len(shard) - 1)
+            is_stored |= shard[positions] == fingerprints
+
+    return is_stored
+
+
+def add_fingerprint_shard(shards, fingerprints, max_shards=MAX_FINGERPRINT_SHARDS):
+    """Add fingerprints to an in-memory list of shards, as a new sorted shard. Returns the list of shards.
+
+    Once there are more than max_shards shards, all are merged into one, so lookups search a bounded number of shards.
+    """
+    shards.append(np.unique(fingerprints))
+    if len(shards) > max_shards:
+        shards[:] = [np.unique(np.concatenate(shards))]
+
+    return shards
+
+
+def check_for_duplicates_incremental(df, fingerprint_dir, max_shards=MAX_FINGERPRINT_SHARDS):
+    """Check newly ingested DataFrame rows for duplicates, against fingerprints of rows checked in previous runs.
+
+    Fingerprints of previously checked rows are stored in fingerprint_dir as append-only shards - sorted .npy files,
+    one per run - so only the new rows are hashed, and stored shards are binary searched memory-mapped, not loaded or
+    re-sorted. Once there are more than max_shards shards, they are merged into one. Prints any duplicates found
+    (within the new rows, or of stored rows), stores the new fingerprints as a shard, and returns dataframe with
+    duplicates dropped.
+    """
+    print("Checking for duplicates against stored fingerprints...\n")
+    os.makedirs(fingerprint_dir, exist_ok=True)
+    shard_files = sorted(glob(os.path.join(fingerprint_dir, "fingerprints-*.npy")))
+
+    fingerprints = get_row_fingerprints(df)
+    is_stored = is_fingerprint_in_shards(fingerprints, [np.load(file, mmap_mode="r") for file in shard_files])
+
+    is_duplicate = is_stored | pd.Series(fingerprints).duplicated().to_numpy()
+    print("Getting duplicates...\n", df[is_duplicate], "\n")
+
+    new_fingerprints = np.unique(fingerprints[~is_stored])
+    if len(new_fingerprints):
+        shard_file = os.path.join(fingerprint_dir,
+                                  f"fingerprints-{int(shard_files[-1][-10:-4]) + 1 if shard_files else 0:06d}.npy")
+
+        if len(shard_files) + 1 > max_shards:
+            np.save(shard_file, np.unique(np.concatenate([np.load(file) for file in shard_files] + [new_fingerprints])))
+            for file in shard_files:
+                os.remove(file)
+        else:
+            np.save(shard_file, new_fingerprints)
+
+    return df[~(is_stored | pd.Series(fingerprints).duplicated(keep='last').to_numpy())]
+
+
 if __name__ == '__main__':
     df_without_dupes = pd.DataFrame({"col_1": [0, 1, 2, 3],
                                      "col_2": [4, 5, 6, 7]})
@@ -28,3 +115,22 @@ if __name__ == '__main__':
 
     df_with_dupes_checked = check_for_duplicates(df_with_dupes)
     print(df_with_dupes_checked)
+
+    df_with_dupes_checked = check_for_duplicates(df_with_dupes, fingerprint=True)
+    print(df_with_dupes_checked)
+
+    # Check new rows against rows checked in previous runs.
+    import tempfile
+    df_new = pd.DataFrame({"col_1": [3.0, 8.0, 9.0, 9.0],
+                           "col_2": [7.0, 10.0, 11.0, 11.0]})
+
+    with tempfile.TemporaryDirectory() as fingerprint_dir_test:
+        check_for_duplicates_incremental(df_without_dupes, fingerprint_dir_test, max_shards=2)
+        df_new_checked = check_for_duplicates_incremental(df_new, fingerprint_dir_test, max_shards=2)
+        print(df_new_checked)
+
+        # Third run merges the shards - all rows checked so far are found in the merged shard.
+        check_for_duplicates_incremental(pd.DataFrame({"col_1": [12.0], "col_2": [13.0]}), fingerprint_dir_test,
+                                         max_shards=2)
+        print(sorted(os.listdir(fingerprint_dir_test)))
+        print(check_for_duplicates_incremental(pd.concat([df_without_dupes, df_new]), fingerprint_dir_test))
@@ -0,0 +1,185 @@
+import pandas as pd
+from pandas.api.types import is_integer_dtype, is_numeric_dtype, is_string_dtype
+from handle_missing_data import fit_imputer, transform_imputer
+
+
+# Cleaning schema for the NHL Summary report. Each column maps to its target dtype, the statistic used to impute
+# missing values (None where no values are missing), and the number of decimals to round to. Columns not listed are
+# passed through unchanged.
+NHL_SUMMARY_SCHEMA = {
+    "Player": {"dtype": "string", "impute": None},
+    "S/C": {"dtype": "string", "impute": "mode"},
+    "Pos": {"dtype": "string", "impute": None},
+    "GP": {"dtype": "int64", "impute": None},
+    "G": {"dtype": "int64", "impute": None},
+    "A": {"dtype": "int64", "impute": None},
+    "P": {"dtype": "int64", "impute": None},
+    "+/-": {"dtype": "int64", "impute": None},
+    "PIM": {"dtype": "int64", "impute": None},
+    "P/GP": {"dtype": "float64", "impute": None, "round": 2},
+    "EVG": {"dtype": "int64", "impute": "mean"},
+    "EVP": {"dtype": "int64", "impute": "mean"},
+    "PPG": {"dtype": "int64", "impute": "mean"},
+    "PPP": {"dtype": "int64", "impute": "mean"},
+    "SHG": {"dtype": "int64", "impute": "mean"},
+    "SHP": {"dtype": "int64", "impute": "mean"},
+    "OTG": {"dtype": "int64", "impute": None},
+    "GWG": {"dtype": "int64", "impute": None},
+    "S": {"dtype": "int64", "impute": "mean"},
+    "S%": {"dtype": "float64", "impute": "mean", "round": 1},
+}
+
+# Columns dropped as mostly missing - TOI/GP and FOW% were not recorded before the modern era.
+NHL_SUMMARY_DROP = ["TOI/GP", "FOW%"]
+
+
+def parse_numeric(series):
+    """Convert Excel-formatted Pandas Series to float64, removing ',' thousands separators and mapping '--' to NaN.
+
+    Uses vectorised string and numeric conversion rather than a regex over every cell.
+    """
+    if is_numeric_dtype(series):
+        return series.astype("float64")
+
+    strings = series.astype("string").str.replace(",", "", regex=False)
+    strings = strings.mask(strings == "--")
+
+    return pd.to_numeric(strings).astype("float64")
+
+
+def parse_text(series):
+    """Convert Pandas Series to string dtype, mapping '--' to NA."""
+    strings = series.astype("string")
+
+    return strings.mask(strings == "--")
+
+
+def compact_dtypes(df, max_category_ratio=0.5):
+    """Convert DataFrame columns to compact dtypes.
+
+    Integer columns are downcast to the smallest integer type that holds all their values, and string columns with
+    fewer unique values than max_category_ratio x row count are converted to categoricals. Returns compacted DataFrame,
+    and DataFrame of memory usage per column, in bytes, before and after.
+    """
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+
+        if is_integer_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+            series = pd.to_numeric(series, downcast="integer")
+        elif is_string_dtype(series) and series.nunique() < max_category_ratio * len(series):
+            series = series.astype("category")
+
+        columns[col] = series
+
+    df_compact = pd.DataFrame(columns, index=df.index)
+
+    memory_usage = pd.DataFrame({"before": df.memory_usage(index=False, deep=True),
+                                 "after": df_compact.memory_usage(index=False, deep=True)})
+    memory_usage.loc["Total"] = memory_usage.sum()
+
+    return df_compact, memory_usage
+
+
+def clean_dataset(df, schema=None, drop=None, compact=False, impute=True, groupby=None):
+    """Clean DataFrame column by column according to a schema.
+
+    Takes DataFrame, schema and list of columns to drop as input (defaulting to the NHL Summary report). Each column is
+    parsed, cast and rounded once, missing values of all columns are imputed in one batch with fit_imputer() and
+    transform_imputer(), and the cleaned DataFrame is built in a single step. Returns cleaned DataFrame, and count of
+    missing values per column before imputation.
+    :param df: DataFrame as compiled by get_dataset_excel()
+    :param schema: dict of column name to dict of 'dtype', 'impute' ('mean', 'mode' or None) and optional 'round'
+    :param drop: list of column names to drop
+    :param compact: if True, convert cleaned DataFrame to compact dtypes with compact_dtypes()
+    :param impute: if False, missing values are kept as NaN/NA, and integer columns with missing values are left as
+    float64 - for cleaning chunks of a dataset, where imputation needs statistics of the full dataset
+    :param groupby: list of column names to impute by group (e.g. ['Pos']), falling back to global statistics
+    :return: cleaned DataFrame, null count Series
+    """
+    if schema is None:
+        schema = NHL_SUMMARY_SCHEMA
+    if drop is None:
+        drop = NHL_SUMMARY_DROP
+
+    print("Cleaning dataset...\n")
+    columns = {}
+    null_check = {}
+    for col in df.columns:
+        if col not in schema:
+            series = df[col]
+            if not is_numeric_dtype(series):
+                series = series.mask(series == "--")
+        elif schema[col]["dtype"] == "string":
+            series = parse_text(df[col])
+        else:
+            series = parse_numeric(df[col])
+
+        null_check[col] = series.isnull().sum()
+        columns[col] = series
+
+    df_parsed = pd.DataFrame(columns, index=df.index)
+
+    # Impute all columns with missing values in one call.
+    strategies = {col: schema[col]["impute"] for col in schema
+                  if col in df_parsed and schema[col]["impute"] is not None and null_check[col] > 0}
+    if impute and strategies:
+        statistics = fit_imputer(df_parsed, strategies, groupby)
+        for col, strategy in strategies.items():
+            by_group = f" by {', '.join(groupby)}" if groupby else ""
+            print(f"Imputing {col} with {strategy}{by_group}: '{statistics['global'][col]}'...\n")
+        df_parsed = transform_imputer(df_parsed, statistics)
+
+    columns = {}
+    for col in df_parsed.columns:
+        if col in drop:
+            continue
+
+        series = df_parsed[col]
+
+        if col in schema:
+            dtype = schema[col]["dtype"]
+            if not impute and null_check[col] > 0 and dtype != "string":
+                dtype = "float64"
+
+            series = series.astype(dtype)
+
+            if "round" in schema[col]:
+                series = series.round(schema[col]["round"])
+
+        columns[col] = series
+
+    print(f"Dropping {', '.join(drop)} columns...\n")
+    df_clean = pd.DataFrame(columns, index=df.index)
+
+    if compact:
+        print("Converting to compact data types...\n")
+        df_clean, memory_usage = compact_dtypes(df_clean)
+        print("Getting memory usage (bytes) before and after...\n", memory_usage, "\n")
+
+    return df_clean, pd.Series(null_check, dtype="int64")
+
+
+if __name__ == '__main__':
+    df_test = pd.DataFrame({"Player": ["A", "B", "C", "D"],
+                            "S/C": ["L", "--", "L", "R"],
+                            "GP": [1, "1,234", 3, 4],
+                            "EVG": [1, 2, "--", 4],
+                            "S%": [10.5, "--", 8, 12.25],
+                            "FOW%": ["--", "--", 50, "--"]})
+    print(df_test)
+
+    schema_test = {"Player": {"dtype": "string", "impute": None},
+                   "S/C": {"dtype": "string", "impute": "mode"},
+                   "GP": {"dtype": "int64", "impute": None},
+                   "EVG": {"dtype": "int64", "impute": "mean"},
+                   "S%": {"dtype": "float64", "impute": "mean", "round": 1}}
+
+    df_cleaned, null_count = clean_dataset(df_test, schema_test, ["FOW%"])
+    print(df_cleaned)
+    print(null_count)
+    print(df_cleaned.info())
+
+    df_compacted, null_count = clean_dataset(df_test, schema_test, ["FOW%"], compact=True)
+    print(df_compacted)
+    print(df_compacted.info())
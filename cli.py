@@ -0,0 +1,236 @@
+import argparse
+import time
+
+# Time the command line interface started - the stages' heavy imports are made after, and are included in the startup
+# time reported.
+START_TIME = time.perf_counter()
+
+# Pipeline modules, and the pandas, scikit-learn, matplotlib and seaborn imports they carry, are imported inside the
+# commands that use them - quick queries such as summarise only load pandas.
+
+RAW_DATA_DIR = "./Raw Data Files/"
+CACHE_DIR = "./Cache/"
+MODEL_FILE = "./Models/Random Forest - {target}.joblib"
+SEED = 1
+
+
+def report_startup(args):
+    """Print time from process start to the end of the command's imports."""
+    print(f"Startup time: {time.perf_counter() - args.start_time:.2f}s\n")
+
+
+def clean_summary(df_nhl):
+    """Clean, sort and de-duplicate the raw Summary DataFrame, as the Data Cleaning stage of main.py."""
+    from clean_dataset import clean_dataset
+    from check_for_duplicates import check_for_duplicates
+
+    df_nhl, missing_count = clean_dataset(df_nhl, compact=True)
+    print("Getting missing_count...\n", missing_count, "\n")
+
+    print("Sorting by P, G, A...\n")
+    df_nhl = df_nhl.sort_values(by=['P', 'G', 'A'], ascending=False).reset_index()
+
+    return check_for_duplicates(df_nhl, fingerprint=True)
+
+
+def get_clean_dataset(directory=RAW_DATA_DIR, cache_dir=CACHE_DIR):
+    """Get cleaned Summary DataFrame - from cache if the input files are unchanged, otherwise ingested and cleaned."""
+    import dataset_cache
+
+    fingerprint = dataset_cache.get_fingerprint(directory)
+    df_nhl = dataset_cache.load_cached_dataset(cache_dir, "Summary", "clean", fingerprint)
+
+    if df_nhl is None:
+        df_nhl = clean_summary(dataset_cache.get_dataset_cached(directory, cache_dir=cache_dir, parallel=True))
+        dataset_cache.save_cached_dataset(df_nhl, cache_dir, "Summary", "clean", fingerprint)
+
+    return df_nhl
+
+
+def get_features(df_nhl, target):
+    """Get feature DataFrame, and memory-mapped float32 feature matrix X and target y from the feature store, as the
+    Machine Learning stage of main.py."""
+    import feature_store
+
+    df_X = df_nhl.drop([target, "Player", "S/C", "Pos"], axis=1)
+    feature_store.write_feature_store(df_X, df_nhl[target].values, target, store_dir=CACHE_DIR + "Features/")
+    X, y, metadata = feature_store.load_feature_store(target, store_dir=CACHE_DIR + "Features/")
+
+    return df_X, X, y
+
+
+def run_ingest(args):
+    """Compile the raw Summary DataFrame from the Excel files, and cache it."""
+    import dataset_cache
+    report_startup(args)
+
+    df_nhl = dataset_cache.get_dataset_cached(args.directory, cache_dir=CACHE_DIR, parallel=True)
+    print("Getting .shape...\n", df_nhl.shape, "\n")
+
+
+def run_clean(args):
+    """Clean the raw Summary DataFrame, and cache the result."""
+    import dataset_cache
+    report_startup(args)
+
+    df_nhl = clean_summary(dataset_cache.get_dataset_cached(args.directory, cache_dir=CACHE_DIR, parallel=True))
+    dataset_cache.save_cached_dataset(df_nhl, CACHE_DIR, "Summary", "clean",
+                                      dataset_cache.get_fingerprint(args.directory))
+
+
+def run_summarise(args):
+    """Summarise the cleaned dataset, or look up players by name."""
+    from summarise_dataset import summarise_dataset
+    import player_index
+    report_startup(args)
+
+    df_nhl = get_clean_dataset(args.directory)
+
+    if args.player:
+        nhl_index = player_index.build_player_index(df_nhl, [])
+        print("Getting players...\n", player_index.get_players(nhl_index, args.player), "\n")
+    else:
+        summarise_dataset(df_nhl, output_file=args.output)
+
+
+def run_plots(args):
+    """Generate the EDA plots, saving them to file."""
+    import matplotlib
+    if not args.show:
+        matplotlib.use("Agg")
+    import seaborn as sns
+    from get_pga_scatterplot import get_pga_scatterplot
+    from get_p_pos_boxplot import get_p_pos_boxplot
+    from get_p_histogram import get_p_histogram
+    report_startup(args)
+
+    df_nhl = get_clean_dataset(args.directory)
+
+    sns.set(rc={'figure.figsize': (16, 9)})
+    for plot_function in [get_pga_scatterplot, get_p_pos_boxplot, get_p_histogram]:
+        plot_function(df_nhl, show=args.show)
+
+
+def run_train(args):
+    """Train the decision tree, random forest and gradient boosting models, printing their RMSE.
+
+    With more than one target in --targets, models for all targets are trained concurrently with multi_target.py, and
+    compared in a table.
+    """
+    if args.targets and len(args.targets) > 1:
+        import multi_target
+        report_startup(args)
+
+        df_nhl = get_clean_dataset(args.directory)
+        df_rmse, df_importances = multi_target.train_targets_parallel(df_nhl.drop(["Player", "S/C", "Pos"], axis=1),
+                                                                      args.targets, SEED)
+        print("Getting RMSE per target...\n", df_rmse, "\n")
+        print("Getting random forest feature importances per target...\n", df_importances, "\n")
+        return
+
+    import matplotlib
+    if not args.show:
+        matplotlib.use("Agg")
+    import experiment_context
+    from implement_decision_tree import implement_decision_tree
+    from implement_random_forest import implement_random_forest
+    from implement_gradient_boosting import implement_gradient_boosting
+    report_startup(args)
+
+    if args.targets:
+        args.target = args.targets[0]
+
+    df_X, X, y = get_features(get_clean_dataset(args.directory), args.target)
+    context = experiment_context.get_experiment_context(len(y), SEED, cache_dir="./Cache/Models/")
+
+    implement_decision_tree(X[:, 4].reshape(-1, 1), y, SEED, context)
+    implement_decision_tree(X, y, SEED, context)
+    implement_random_forest(X, y, SEED, df_X, args.target, context, show=args.show)
+    implement_gradient_boosting(X, y, SEED, df_X, args.target, context, show=args.show)
+
+
+def run_tune(args):
+    """Tune the random forest hyperparameters, and save the tuned model for predict."""
+    import matplotlib
+    if not args.show:
+        matplotlib.use("Agg")
+    from sklearn.ensemble import RandomForestRegressor
+    import experiment_context
+    import model_service
+    from tune_random_forest import tune_random_forest
+    report_startup(args)
+
+    df_X, X, y = get_features(get_clean_dataset(args.directory), args.target)
+    context = experiment_context.get_experiment_context(len(y), SEED, cache_dir="./Cache/Models/")
+
+    # Same base model as implement_random_forest().
+    rf = RandomForestRegressor(n_estimators=400, min_samples_leaf=0.12, random_state=SEED)
+    rf_tuned = tune_random_forest(rf, X, y, SEED, df_X, args.target, search=args.search,
+                                  time_budget=args.time_budget, context=context, show=args.show)
+
+    model_service.save_model(rf_tuned, df_X.columns, args.target, MODEL_FILE.format(target=args.target))
+
+
+def run_predict(args):
+    """Predict with a saved model for players in a file, with model_service.py."""
+    import model_service
+    report_startup(args)
+
+    argv = ["--model", args.model, "predict", args.input, "--batch-size", str(args.batch_size)]
+    if args.output:
+        argv += ["--output", args.output]
+
+    model_service.main(argv)
+
+
+def main(start_time=None):
+    """Command line interface - run a single pipeline stage. Returns exit status.
+
+    Takes the time the process started, from time.perf_counter(), for the startup time report - defaulting to the
+    time this module was imported.
+    """
+    parser = argparse.ArgumentParser(description="Run a stage of the NHL player statistics pipeline.")
+    parser.add_argument("--directory", default=RAW_DATA_DIR, help="directory of Excel report files")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("ingest", help="compile raw dataset from Excel files").set_defaults(run=run_ingest)
+    subparsers.add_parser("clean", help="clean raw dataset").set_defaults(run=run_clean)
+
+    parser_summarise = subparsers.add_parser("summarise", help="summarise cleaned dataset, or look up players")
+    parser_summarise.add_argument("--player", nargs="+", help="player names to look up")
+    parser_summarise.add_argument("--output", help="also write summary to a .json or .html file")
+    parser_summarise.set_defaults(run=run_summarise)
+
+    for command, run, help_text in [("plots", run_plots, "generate EDA plots"),
+                                    ("train", run_train, "train models and print RMSE"),
+                                    ("tune", run_tune, "tune random forest and save model")]:
+        parser_command = subparsers.add_parser(command, help=help_text)
+        parser_command.add_argument("--show", action="store_true", help="display plots on screen")
+        parser_command.set_defaults(run=run)
+        if command != "plots":
+            parser_command.add_argument("--target", default="G")
+        if command == "train":
+            parser_command.add_argument("--targets", nargs="+", help="train for several targets concurrently")
+        if command == "tune":
+            parser_command.add_argument("--search", default="warm_start",
+                                        choices=["grid", "halving", "random", "warm_start"])
+            parser_command.add_argument("--time-budget", type=float, help="seconds, for warm_start search")
+
+    parser_predict = subparsers.add_parser("predict", help="predict for players in a .csv or .xlsx file")
+    parser_predict.add_argument("input", help="input file, with the model's feature columns")
+    parser_predict.add_argument("--model", default=MODEL_FILE.format(target="G"), help="model file from tune")
+    parser_predict.add_argument("--output", help="output .csv file (printed if not given)")
+    parser_predict.add_argument("--batch-size", type=int, default=100000, help="rows predicted per call")
+    parser_predict.set_defaults(run=run_predict)
+
+    args = parser.parse_args()
+    args.start_time = START_TIME if start_time is None else start_time
+
+    args.run(args)
+    print(f"Total time: {time.perf_counter() - args.start_time:.2f}s\n")
+
+    return 0
+
+
+if __name__ == '__main__':
+    main()
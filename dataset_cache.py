@@ -0,0 +1,92 @@
+import hashlib
+import os
+import pandas as pd
+from glob import glob
+from get_dataset import get_dataset_excel
+
+
+def get_fingerprint(directory, report="Summary", hash_contents=False):
+    """Generate a fingerprint of the set of input Excel files for a report type.
+
+    The fingerprint is built from the name, size and modification time of each file, so that it changes when any file
+    is added, removed or modified. If hash_contents is True, the file contents are hashed instead of the modification
+    time, which is slower but survives copying files between machines. Returns fingerprint as hex string.
+    """
+    fingerprint = hashlib.sha256()
+
+    for file in sorted(glob(f"{directory}/{report}*.xlsx")):
+        stat = os.stat(file)
+        fingerprint.update(os.path.basename(file).encode())
+        fingerprint.update(str(stat.st_size).encode())
+
+        if hash_contents:
+            with open(file, "rb") as in_file:
+                fingerprint.update(in_file.read())
+        else:
+            fingerprint.update(str(stat.st_mtime_ns).encode())
+
+    return fingerprint.hexdigest()[:16]
+
+
+def get_cache_path(cache_dir, report, stage, fingerprint):
+    """Get path of cache file for report type, pipeline stage ('raw' or 'clean'), and input fingerprint."""
+    return os.path.join(cache_dir, f"{report} - {stage} - {fingerprint}.pkl")
+
+
+def load_cached_dataset(cache_dir, report, stage, fingerprint):
+    """Load DataFrame from cache, if available for the given fingerprint.
+
+    Returns DataFrame, or None if there is no valid cache entry.
+    """
+    cache_path = get_cache_path(cache_dir, report, stage, fingerprint)
+
+    if not os.path.exists(cache_path):
+        return None
+
+    print(f"Loading {stage} {report} dataframe from cache - {cache_path}...\n")
+
+    return pd.read_pickle(cache_path)
+
+
+def save_cached_dataset(df, cache_dir, report, stage, fingerprint):
+    """Save DataFrame to cache, removing stale cache entries for the same report type and stage."""
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Remove entries for previous versions of the input files.
+    for stale_path in glob(os.path.join(cache_dir, f"{report} - {stage} - *.pkl")):
+        os.remove(stale_path)
+
+    cache_path = get_cache_path(cache_dir, report, stage, fingerprint)
+    print(f"Saving {stage} {report} dataframe to cache - {cache_path}...\n")
+    df.to_pickle(cache_path)
+
+
+def get_dataset_cached(directory, report="Summary", cache_dir="./Cache/", parallel=False, hash_contents=False):
+    """Generate Pandas DataFrame from input Excel files, reusing cached DataFrame where the input files are unchanged.
+
+    Takes the same arguments as get_dataset_excel(), plus the cache directory. Returns DataFrame compiled from input
+    files, or loaded from cache.
+    """
+    fingerprint = get_fingerprint(directory, report, hash_contents)
+
+    df_nhl = load_cached_dataset(cache_dir, report, "raw", fingerprint)
+
+    if df_nhl is None:
+        df_nhl = get_dataset_excel(directory, report, parallel=parallel)
+        save_cached_dataset(df_nhl, cache_dir, report, "raw", fingerprint)
+
+    return df_nhl
+
+
+if __name__ == '__main__':
+    directory = './Raw Data Files/'
+
+    # First call parses Excel files, second call loads from cache.
+    df_nhl_summary = get_dataset_cached(directory, "Summary")
+    df_nhl_summary_cached = get_dataset_cached(directory, "Summary")
+
+    # Check that cached DataFrame matches DataFrame compiled from files.
+    print(df_nhl_summary.equals(df_nhl_summary_cached), "\n")
+
+    print(get_fingerprint(directory, "Summary"))
+    print(get_fingerprint(directory, "Summary", hash_contents=True))
@@ -0,0 +1,143 @@
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.model_selection import KFold
+from sklearn.metrics import mean_squared_error as MSE
+from sklearn.base import clone
+from joblib import Memory, Parallel, delayed, hash as joblib_hash
+
+
+def get_experiment_context(n_samples, SEED, test_size=0.3, cache_dir=None):
+    """Generate shared train/test split and CV fold indices, and a cache of fitted models, for model experiments.
+
+    The split is computed once on row indices, and matches train_test_split(X, y, test_size, random_state=SEED) for
+    any X and y of n_samples rows. If cache_dir is given, fitted models are also cached on disk, so that re-running the
+    pipeline does not redo identical fits.
+    :param n_samples: number of rows in the dataset
+    :param SEED: seed for random number generation
+    :param test_size: proportion of the dataset in the test set
+    :param cache_dir: directory for on-disk cache of fitted models, or None for an in-memory cache only
+    :return: experiment context dict
+    """
+    train, test = train_test_split(np.arange(n_samples), test_size=test_size, random_state=SEED)
+
+    return {"train": train,
+            "test": test,
+            "folds": {},
+            "splits": [],
+            "fits": {},
+            "memory": Memory(cache_dir, verbose=0)}
+
+
+def get_split(context, X, y):
+    """Split X and y into training and test sets by the context split indices.
+
+    The split is shuffled, so the sets are copies, not views. Each (X, y) pair is split once per context, and the same
+    copies are returned to every model sharing the context.
+    """
+    for X_split, y_split, split in context["splits"]:
+        if X_split is X and y_split is y:
+            return split
+
+    split = X[context["train"]], X[context["test"]], y[context["train"]], y[context["test"]]
+    context["splits"].append((X, y, split))
+
+    return split
+
+
+def get_fold_rows(fold_rows):
+    """Get a slice for CV fold rows that are a contiguous range, as unshuffled K-fold validation folds are, so that
+    they are selected as a view. Other rows are returned as they are, and selected as a copy."""
+    if len(fold_rows) and fold_rows[-1] - fold_rows[0] + 1 == len(fold_rows):
+        return slice(fold_rows[0], fold_rows[-1] + 1)
+
+    return fold_rows
+
+
+def get_folds(context, n_splits):
+    """Get list of (train, test) CV fold indices into the training set, computed once per number of folds.
+
+    Folds are unshuffled K-folds, matching cross_val_score(..., cv=n_splits) and GridSearchCV(..., cv=n_splits) for
+    regressors.
+    """
+    if n_splits not in context["folds"]:
+        context["folds"][n_splits] = list(KFold(n_splits=n_splits).split(context["train"]))
+
+    return context["folds"][n_splits]
+
+
+def fit_predict(estimator, X_train, y_train, X_test):
+    """Fit a clone of estimator, and predict the training and test sets. Returns model, and both predictions."""
+    model = clone(estimator).fit(X_train, y_train)
+
+    return model, model.predict(X_train), model.predict(X_test)
+
+
+def get_fit_key(estimator, data_key, fold):
+    """Get cache key for a fit - estimator type and parameters, data hash, and fold ('train' for the training set)."""
+    return type(estimator).__name__, joblib_hash(estimator.get_params()), data_key, fold
+
+
+def fit_predict_cached(context, estimator, X, y):
+    """Fit estimator on the context training set, reusing an identical previous fit if cached.
+
+    Returns fitted model, predictions on the training set, and predictions on the test set.
+    """
+    key = get_fit_key(estimator, joblib_hash((X, y)), "train")
+
+    if key not in context["fits"]:
+        X_train, X_test, y_train, y_test = get_split(context, X, y)
+        context["fits"][key] = context["memory"].cache(fit_predict)(estimator, X_train, y_train, X_test)
+
+    return context["fits"][key]
+
+
+def cross_val_mse_cached(context, estimator, X, y, n_splits, n_jobs=-1):
+    """Cross-validate estimator on the context training set, fitting in parallel only folds not already cached.
+
+    Returns numpy array of MSE per fold, as -cross_val_score(..., scoring="neg_mean_squared_error").
+    """
+    data_key = joblib_hash((X, y))
+    X_train, X_test, y_train, y_test = get_split(context, X, y)
+    folds = get_folds(context, n_splits)
+
+    keys = [get_fit_key(estimator, data_key, (n_splits, i)) for i in range(n_splits)]
+    uncached = [i for i, key in enumerate(keys) if key not in context["fits"]]
+
+    # Training folds are copies; validation folds are contiguous ranges of the training set, selected as views.
+    fits = Parallel(n_jobs=n_jobs)(delayed(context["memory"].cache(fit_predict))(estimator,
+                                                                                  X_train[folds[i][0]],
+                                                                                  y_train[folds[i][0]],
+                                                                                  X_train[get_fold_rows(folds[i][1])])
+                                   for i in uncached)
+    for i, fit in zip(uncached, fits):
+        context["fits"][keys[i]] = fit
+
+    return np.array([MSE(y_train[test], context["fits"][key][2]) for key, (train, test) in zip(keys, folds)])
+
+
+if __name__ == '__main__':
+    from sklearn.tree import DecisionTreeRegressor
+    from sklearn.model_selection import cross_val_score
+
+    rng = np.random.default_rng(1)
+    X_test_data = rng.normal(size=(200, 3))
+    y_test_data = X_test_data @ np.array([1.0, 2.0, 3.0]) + rng.normal(size=200)
+
+    context_test = get_experiment_context(len(X_test_data), 1)
+    dt = DecisionTreeRegressor(max_depth=3, random_state=1)
+
+    # Check split and CV against train_test_split() and cross_val_score().
+    X_train_check, X_test_check, y_train_check, y_test_check = train_test_split(X_test_data, y_test_data,
+                                                                                test_size=0.3, random_state=1)
+    print(np.array_equal(get_split(context_test, X_test_data, y_test_data)[0], X_train_check))
+    print(get_split(context_test, X_test_data, y_test_data)[0] is get_split(context_test, X_test_data, y_test_data)[0])
+    print(np.shares_memory(X_train_check[get_fold_rows(get_folds(context_test, 5)[0][1])], X_train_check))
+    print(cross_val_mse_cached(context_test, dt, X_test_data, y_test_data, 5))
+    print(-cross_val_score(dt, X_train_check, y_train_check, cv=5, scoring="neg_mean_squared_error"))
+
+    # Second call is served from the cache.
+    print(len(context_test["fits"]))
+    cross_val_mse_cached(context_test, dt, X_test_data, y_test_data, 5)
+    fit_predict_cached(context_test, dt, X_test_data, y_test_data)
+    fit_predict_cached(context_test, dt, X_test_data, y_test_data)
+    print(len(context_test["fits"]))
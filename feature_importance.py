@@ -0,0 +1,175 @@
+import os
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, hash as joblib_hash
+from scipy.sparse import csr_matrix
+from sklearn.metrics import mean_squared_error as MSE
+
+try:
+    import shap
+except ImportError:     # Optional - exact TreeSHAP values. Path attributions are computed without it.
+    shap = None
+
+# Importance kinds supported by get_importances().
+IMPORTANCE_KINDS = ["impurity", "permutation", "attribution"]
+
+
+def get_model_fingerprint(model, X, y=None):
+    """Fingerprint a fitted model with the data its importances are computed on. Returns fingerprint as hex string."""
+    return joblib_hash((model, X, y))[:16]
+
+
+def permute_feature_mse(model, X, y, feature, n_repeats, SEED):
+    """Predict with one feature column of X shuffled, n_repeats times. Returns list of MSE of each prediction.
+
+    Each repeat is seeded from SEED, the feature and the repeat. X is copied once, and only the shuffled column is
+    rewritten between repeats. Defined at module level so that it can be run in worker processes.
+    """
+    X_permuted = np.array(X, copy=True)
+    mse_repeats = []
+    for repeat in range(n_repeats):
+        X_permuted[:, feature] = np.random.default_rng([SEED, feature, repeat]).permutation(X[:, feature])
+        mse_repeats.append(MSE(y, model.predict(X_permuted)))
+
+    return mse_repeats
+
+
+def get_permutation_importances(model, X, y, n_repeats=5, SEED=1, n_jobs=-1):
+    """Compute permutation importance - the increase in MSE when each feature is shuffled - in parallel.
+
+    Each feature is a separate task, running its repeats in turn, so the model and data are sent to workers once per
+    feature rather than once per repeat. Each repeat is seeded from SEED, the feature and the repeat, so results do
+    not depend on n_jobs. Returns DataFrame of MSE increase, one row per feature and one column per repeat.
+    """
+    X = np.asarray(X, dtype="float64")
+    y = np.ravel(y)
+    mse_base = MSE(y, model.predict(X))
+
+    mse_permuted = Parallel(n_jobs=n_jobs)(delayed(permute_feature_mse)(model, X, y, feature, n_repeats, SEED)
+                                           for feature in range(X.shape[1]))
+
+    return pd.DataFrame(np.reshape(mse_permuted, (X.shape[1], n_repeats)) - mse_base)
+
+
+def get_tree_path_attributions(tree, X):
+    """Attribute each prediction of a fitted decision tree to its features, along the decision path of each sample.
+
+    At each split on a sample's path, the change in node value is credited to the split feature, so that the tree's
+    root value plus the attributions of a sample equals its prediction. Computed for all samples at once, as the
+    product of the sparse decision path matrix and a sparse node-to-feature matrix. Returns numpy array of attributions
+    (samples x features), and the root value.
+    """
+    tree_ = tree.tree_
+    values = tree_.value[:, 0, 0]
+
+    internal = np.flatnonzero(tree_.children_left >= 0)
+    parent = np.full(tree_.node_count, -1)
+    parent[tree_.children_left[internal]] = internal
+    parent[tree_.children_right[internal]] = internal
+
+    nodes = np.flatnonzero(parent >= 0)
+    node_features = csr_matrix((values[nodes] - values[parent[nodes]], (nodes, tree_.feature[parent[nodes]])),
+                               shape=(tree_.node_count, tree.n_features_in_))
+
+    return (tree.decision_path(X) @ node_features).toarray(), values[0]
+
+
+def get_attributions(model, X):
+    """Compute per-sample feature attributions for a tree or forest model, TreeSHAP-style.
+
+    Uses exact TreeSHAP values if the optional shap package is installed, otherwise path attributions from
+    get_tree_path_attributions(), averaged over the trees of a forest. In both cases the expected value plus the
+    attributions of a sample equals its prediction. Returns numpy array of attributions (samples x features).
+    """
+    X = np.asarray(X, dtype="float32")
+
+    if shap is not None:
+        return shap.TreeExplainer(model).shap_values(X)
+
+    trees = getattr(model, "estimators_", [model])
+    if not all(hasattr(tree, "tree_") for tree in trees):
+        raise TypeError(f"Path attributions need a decision tree or random forest, got {type(model).__name__}")
+
+    return sum(get_tree_path_attributions(tree, X)[0] for tree in trees) / len(trees)
+
+
+def get_importances(model, X, y, kind="impurity", n_repeats=5, SEED=1, n_jobs=-1):
+    """Compute feature importance of a fitted model, of the given kind.
+
+    :param model: fitted scikit-learn model
+    :param X: feature matrix to compute importance on (the test set, for permutation importance), numpy ndarray
+    :param y: target, numpy ndarray
+    :param kind: 'impurity' (the model's feature_importances_), 'permutation' (mean MSE increase from
+    get_permutation_importances()) or 'attribution' (mean absolute attribution from get_attributions())
+    :param n_repeats: repeats per feature for permutation importance
+    :param SEED: seed for permutation importance
+    :param n_jobs: number of parallel jobs for permutation importance
+    :return: numpy array of importance per feature
+    """
+    if kind == "impurity":
+        return model.feature_importances_
+    elif kind == "permutation":
+        return get_permutation_importances(model, X, y, n_repeats, SEED, n_jobs).mean(axis=1).to_numpy()
+    elif kind == "attribution":
+        return np.abs(get_attributions(model, X)).mean(axis=0)
+    else:
+        raise ValueError(f"Unknown importance kind: {kind}")
+
+
+def get_importances_cached(model, X, y, kind="impurity", cache_dir="./Cache/Importance/", **kwargs):
+    """Compute feature importance with get_importances(), reusing the result saved for the same model and data.
+
+    Results are cached under the kind and a fingerprint of the fitted model, X and y, so repeat runs of the same fit
+    are not recomputed. Impurity importance is stored on the model, and is not cached. Returns numpy array of
+    importance per feature.
+    """
+    if kind == "impurity":
+        return get_importances(model, X, y, kind)
+
+    method = "shap" if kind == "attribution" and shap is not None else ""
+    fingerprint = joblib_hash((get_model_fingerprint(model, X, y), kind, method, kwargs))[:16]
+    cache_path = os.path.join(cache_dir, f"{kind} - {fingerprint}.npy")
+
+    if os.path.exists(cache_path):
+        print(f"Loading {kind} feature importance from cache - {cache_path}...\n")
+        return np.load(cache_path)
+
+    print(f"Computing {kind} feature importance...\n")
+    importances = get_importances(model, X, y, kind, **kwargs)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(cache_path, importances)
+
+    return importances
+
+
+if __name__ == '__main__':
+    import tempfile
+    import time
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.inspection import permutation_importance
+
+    rng = np.random.default_rng(1)
+    X_test = rng.normal(size=(5000, 6))
+    y_test = 3 * X_test[:, 0] + X_test[:, 1] ** 2 + rng.normal(scale=0.1, size=5000)
+    rf_test = RandomForestRegressor(n_estimators=50, max_depth=8, random_state=1).fit(X_test, y_test)
+
+    # Path attributions add up to the predictions.
+    attributions = get_attributions(rf_test, X_test)
+    bias = np.mean([tree.tree_.value[0, 0, 0] for tree in rf_test.estimators_])
+    print(np.allclose(bias + attributions.sum(axis=1), rf_test.predict(X_test)), "\n")
+
+    # Permutation importance ranks features as scikit-learn's permutation_importance().
+    print(get_permutation_importances(rf_test, X_test, y_test), "\n")
+    sklearn_permutation = permutation_importance(rf_test, X_test, y_test, n_repeats=5, random_state=1,
+                                                 scoring="neg_mean_squared_error")
+    print(np.array_equal(np.argsort(get_importances(rf_test, X_test, y_test, "permutation")),
+                         np.argsort(sklearn_permutation.importances_mean)), "\n")
+
+    # Second call for the same model is loaded from cache.
+    with tempfile.TemporaryDirectory() as test_dir:
+        for kind_test in IMPORTANCE_KINDS:
+            for _ in range(2):
+                start = time.perf_counter()
+                print(get_importances_cached(rf_test, X_test, y_test, kind_test, cache_dir=test_dir))
+                print(f"{time.perf_counter() - start:.3f}s\n")
@@ -0,0 +1,78 @@
+import json
+import os
+import numpy as np
+
+
+def get_store_paths(store_dir, target):
+    """Get paths of the feature matrix, target and metadata files of a feature store."""
+    return (os.path.join(store_dir, f"{target} - X.npy"),
+            os.path.join(store_dir, f"{target} - y.npy"),
+            os.path.join(store_dir, f"{target} - metadata.json"))
+
+
+def write_feature_store(df_X, y, target, store_dir="./Cache/Features/"):
+    """Write feature matrix and target to disk as C-contiguous float32 arrays, with column metadata.
+
+    The matrix is written column by column into a memory-mapped .npy file, so no mixed-dtype or float64 copy of the
+    whole DataFrame is made. The target is stored 1d. Metadata holds column names and original dtypes, to map model
+    inputs back to features.
+    :param df_X: feature DataFrame, numeric columns only
+    :param y: target, numpy ndarray (1d or column vector), or None to store the matrix only
+    :param target: target name, string - also names the store
+    :param store_dir: directory of the feature store
+    :return: none
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    X_file, y_file, metadata_file = get_store_paths(store_dir, target)
+
+    print(f"Writing {target} feature store to {store_dir}...\n")
+    X = np.lib.format.open_memmap(X_file, mode="w+", dtype="float32", shape=df_X.shape)
+    for i, col in enumerate(df_X.columns):
+        X[:, i] = df_X[col].to_numpy(dtype="float32")
+    X.flush()
+    del X
+
+    if y is not None:
+        np.save(y_file, np.ravel(np.asarray(y, dtype="float32")))
+    elif os.path.exists(y_file):
+        os.remove(y_file)
+
+    with open(metadata_file, "w") as out_file:
+        json.dump({"target": target,
+                   "columns": list(df_X.columns),
+                   "dtypes": {col: str(dtype) for col, dtype in df_X.dtypes.items()},
+                   "shape": list(df_X.shape)}, out_file, indent=2)
+
+
+def load_feature_store(target, store_dir="./Cache/Features/"):
+    """Open feature store written by write_feature_store(), memory-mapped and read-only.
+
+    Arrays are paged in from disk as they are read, and are passed to joblib worker processes as references to the
+    file rather than pickled copies. Returns X and y as numpy memmaps (y is None if not stored), and metadata dict.
+    """
+    X_file, y_file, metadata_file = get_store_paths(store_dir, target)
+
+    with open(metadata_file) as in_file:
+        metadata = json.load(in_file)
+
+    y = np.load(y_file, mmap_mode="r") if os.path.exists(y_file) else None
+
+    return np.load(X_file, mmap_mode="r"), y, metadata
+
+
+if __name__ == '__main__':
+    import tempfile
+    import pandas as pd
+
+    df_test = pd.DataFrame({"GP": np.array([1, 1234, 82], dtype="int16"),
+                            "P/GP": [0.5, 1.92, 0.1],
+                            "Pos": pd.Series(["C", "D", "L"], dtype="category").cat.codes})
+
+    with tempfile.TemporaryDirectory() as test_dir:
+        write_feature_store(df_test, np.array([[3], [4], [5]]), "G", test_dir)
+        X_test, y_test, metadata_test = load_feature_store("G", test_dir)
+
+        print(X_test, X_test.dtype, X_test.flags["C_CONTIGUOUS"], type(X_test))
+        print(y_test, y_test.shape)
+        print(metadata_test)
+        del X_test, y_test
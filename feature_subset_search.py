@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import mean_squared_error as MSE
+import experiment_context
+
+
+def get_fold_arrays(context, X, y, n_splits):
+    """Split the context training set into CV folds once, for evaluating many feature subsets.
+
+    Fold arrays are stored as Fortran-ordered float32 - the dtype trees fit on - so selecting a subset of columns
+    copies contiguous columns, and the tree does no further conversion. Row indexing returns C-ordered arrays, so each
+    fold array is converted after indexing. Returns list of (X_train, y_train, X_val, y_val) per fold.
+    """
+    X_train, X_test, y_train, y_test = experiment_context.get_split(context, X, y)
+
+    return [(np.asfortranarray(X_train[train], dtype="float32"), y_train[train],
+             np.asfortranarray(X_train[test], dtype="float32"), y_train[test])
+            for train, test in experiment_context.get_folds(context, n_splits)]
+
+
+def get_subset_mse(estimator, fold_arrays, cols):
+    """Cross-validate estimator on feature columns cols of the fold arrays. Returns mean MSE across folds."""
+    mse_folds = []
+    for X_train, y_train, X_val, y_val in fold_arrays:
+        model = clone(estimator).fit(X_train[:, cols], y_train)
+        mse_folds.append(MSE(y_val, model.predict(X_val[:, cols])))
+
+    return np.mean(mse_folds)
+
+
+def evaluate_subsets(estimator, fold_arrays, subsets, n_jobs=-1):
+    """Cross-validate estimator on each feature subset, in parallel. Returns list of mean MSE, in order of subsets.
+
+    The fold arrays are below joblib's default threshold for memory-mapping, and would be pickled again for every
+    subset. With max_nbytes=0 they are dumped to a memory-mapped file once, and each task is sent a reference to it.
+    """
+    return Parallel(n_jobs=n_jobs, max_nbytes=0)(delayed(get_subset_mse)(estimator, fold_arrays, list(cols))
+                                                 for cols in subsets)
+
+
+def search_feature_subsets(estimator, X, y, df_X, SEED, mode="single", max_features=None, n_splits=10,
+                           context=None, n_jobs=-1):
+    """Search subsets of feature columns for the lowest CV RMSE of an estimator.
+
+    Mode 'single' evaluates each feature on its own. Mode 'forward' is forward selection - starting from no features,
+    each round adds the feature giving the lowest CV RMSE, until max_features are selected or no feature improves the
+    RMSE. Folds are split once and shared by all subsets, and the subsets of each round are evaluated in parallel.
+    CV RMSE is computed as in implement_decision_tree() - the square root of the mean fold MSE.
+    :param estimator: unfitted scikit-learn regressor, e.g. DecisionTreeRegressor
+    :param X: feature matrix, numpy ndarray
+    :param y: target, 1d numpy ndarray
+    :param df_X: X as DataFrame object, for feature names
+    :param SEED: seed for random number generation
+    :param mode: 'single' or 'forward'
+    :param max_features: maximum subset size for 'forward' mode (defaults to all features)
+    :param n_splits: number of CV folds
+    :param context: experiment context from experiment_context.get_experiment_context(), shared between models
+    :param n_jobs: number of parallel jobs
+    :return: DataFrame of subsets evaluated, ranked by CV RMSE
+    """
+    if context is None:
+        context = experiment_context.get_experiment_context(len(X), SEED)
+    if max_features is None:
+        max_features = X.shape[1]
+
+    fold_arrays = get_fold_arrays(context, X, y, n_splits)
+    features = list(df_X.columns)
+
+    results = {}
+    if mode == "single":
+        subsets = [(col,) for col in range(len(features))]
+        results.update(zip(subsets, evaluate_subsets(estimator, fold_arrays, subsets, n_jobs)))
+    elif mode == "forward":
+        selected = ()
+        best_mse = np.inf
+        while len(selected) < max_features:
+            subsets = [selected + (col,) for col in range(len(features)) if col not in selected]
+            if not subsets:
+                break
+
+            mse_round = evaluate_subsets(estimator, fold_arrays, subsets, n_jobs)
+            results.update(zip(subsets, mse_round))
+
+            if min(mse_round) >= best_mse:
+                break
+
+            best_mse = min(mse_round)
+            selected = subsets[int(np.argmin(mse_round))]
+            print(f"Forward selection - adding {features[selected[-1]]}, RMSE_CV: {best_mse ** (1 / 2)}")
+        print()
+    else:
+        raise ValueError(f"Unknown search mode: {mode}")
+
+    df_subsets = pd.DataFrame({"features": [", ".join(features[col] for col in cols) for cols in results],
+                               "n_features": [len(cols) for cols in results],
+                               "RMSE_CV": np.sqrt(list(results.values()))})
+
+    return df_subsets.sort_values(["RMSE_CV", "n_features"], kind="stable").reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    import time
+    from sklearn.tree import DecisionTreeRegressor
+    from sklearn.model_selection import cross_val_score
+
+    rng = np.random.default_rng(1)
+    n_players = 5000
+    games_played = rng.integers(1, 1800, n_players)
+    shots = rng.binomial(games_played, 0.4)
+    df_test = pd.DataFrame({"GP": games_played,
+                            "S": shots,
+                            "PIM": rng.binomial(games_played, 0.8),
+                            "+/-": rng.integers(-100, 100, n_players)})
+    y_test = rng.binomial(shots, 0.1)
+    dt_test = DecisionTreeRegressor(max_depth=4, min_samples_leaf=0.14, random_state=1)
+
+    start = time.perf_counter()
+    print(search_feature_subsets(dt_test, df_test.values, y_test, df_test, 1, mode="single"), "\n")
+    print(search_feature_subsets(dt_test, df_test.values, y_test, df_test, 1, mode="forward"), "\n")
+    print(f"{time.perf_counter() - start:.2f}s\n")
+
+    # CV RMSE matches cross_val_score() on the same training set.
+    context_test = experiment_context.get_experiment_context(n_players, 1)
+    X_train_test, X_test_test, y_train_test, y_test_test = experiment_context.get_split(context_test, df_test.values,
+                                                                                         y_test)
+    mse_cv = -cross_val_score(dt_test, X_train_test[:, [1]], y_train_test, cv=10, scoring="neg_mean_squared_error")
+    print(mse_cv.mean() ** (1 / 2))
@@ -1,39 +1,79 @@
 import pandas as pd
 from glob import glob
+from concurrent.futures import ProcessPoolExecutor
 
 
-def get_dataset_excel(directory, report="Summary"):
+def read_excel_file(file):
+    """Read a single Excel file into a DataFrame.
+
+    Defined at module level so that it can be pickled and run in worker processes.
+    """
+    return pd.read_excel(file, engine="openpyxl")
+
+
+def get_dataset_excel(directory, report="Summary", parallel=False, max_workers=None):
     """Generate Pandas DataFrame from input Excel files.
 
     Takes two strings as input: the directory path and the report type (represented in file name). Returns DataFrame
-    compiled from input files.
+    compiled from input files. Files are parsed in order of file name, and concatenated once at the end. If parallel is
+    True, files are parsed concurrently in a process pool of max_workers processes (defaults to the number of CPUs).
     """
-    # Create empty dataframe.
-    df_nhl = pd.DataFrame()
+    # Sort file names so that row order does not depend on the file system.
+    files = sorted(glob(f"{directory}/{report}*.xlsx"))
 
-    # Iterate over .xlsx files in target directory, of target report type.
+    # Parse .xlsx files in target directory, of target report type.
     print(f"Compiling dataframe from {report} report...")
-    files_parsed = 0
-    for file in glob(f"{directory}/{report}*.xlsx"):
-        print(file)
-        df_players = pd.read_excel(file, engine="openpyxl")
+    if parallel and len(files) > 1:
+        # Executor.map() returns results in the order of the input files.
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            df_files = list(executor.map(read_excel_file, files))
 
-        files_parsed += 1
-
-        # Concatenate existing dataframe with dataframe generated from file.
-        df_nhl = pd.concat([df_nhl, df_players])
+        for file in files:
+            print(file)
+    else:
+        df_files = []
+        for file in files:
+            print(file)
+            df_files.append(read_excel_file(file))
 
+    files_parsed = len(df_files)
     print(f"\nFiles parsed: {files_parsed}\n")
 
+    # Concatenate dataframes generated from files in a single pass.
+    if files_parsed == 0:
+        return pd.DataFrame()
+
+    df_nhl = pd.concat(df_files)
+
     return df_nhl
 
 
+def iter_dataset_excel(directory, report="Summary"):
+    """Generate Pandas DataFrames from input Excel files, one file at a time.
+
+    Takes the same arguments as get_dataset_excel(), and yields the DataFrame for each file in order of file name, so
+    that datasets larger than memory can be processed in chunks.
+    """
+    print(f"Streaming dataframe chunks from {report} report...")
+    for file in sorted(glob(f"{directory}/{report}*.xlsx")):
+        print(file)
+        yield read_excel_file(file)
+
+
 if __name__ == '__main__':
     directory = './Raw Data Files/'
 
     df_nhl_summary = get_dataset_excel(directory, "Summary")
     print(df_nhl_summary, "\n")
 
+    df_nhl_summary_parallel = get_dataset_excel(directory, "Summary", parallel=True)
+    print(df_nhl_summary_parallel, "\n")
+
+    # Check that parallel parsing gives the same result as serial parsing.
+    print(df_nhl_summary.equals(df_nhl_summary_parallel), "\n")
+
+    # Check that chunks streamed from files match the compiled dataframe.
+    print(pd.concat(iter_dataset_excel(directory, "Summary")).equals(df_nhl_summary), "\n")
+
     df_nhl_bio = get_dataset_excel(directory, "Bio Info")
     print(df_nhl_bio, "\n")
-
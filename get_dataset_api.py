@@ -0,0 +1,339 @@
+import hashlib
+import http.client
+import io
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from glob import glob
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+# NHL.com stats API endpoint behind the Summary report of https://www.nhl.com/stats/skaters.
+STATS_API_URL = "https://api.nhle.com/stats/rest/en/skater/summary"
+
+# Query for all-time regular season totals, as in the page URLs from get_data_urls(). Paging is added per request.
+STATS_API_QUERY = {"isAggregate": "true",
+                   "isGame": "false",
+                   "sort": json.dumps([{"property": "points", "direction": "DESC"},
+                                       {"property": "goals", "direction": "DESC"},
+                                       {"property": "assists", "direction": "DESC"}]),
+                   "factCayenneExp": "gamesPlayed>=1",
+                   "cayenneExp": "gameTypeId=2 and seasonId<=20212022 and seasonId>=19171918"}
+
+# Stats API fields of the Summary report, mapped to the column names of the Excel export, in order.
+SUMMARY_API_FIELDS = {"skaterFullName": "Player",
+                      "shootsCatches": "S/C",
+                      "positionCode": "Pos",
+                      "gamesPlayed": "GP",
+                      "goals": "G",
+                      "assists": "A",
+                      "points": "P",
+                      "plusMinus": "+/-",
+                      "penaltyMinutes": "PIM",
+                      "pointsPerGame": "P/GP",
+                      "evGoals": "EVG",
+                      "evPoints": "EVP",
+                      "ppGoals": "PPG",
+                      "ppPoints": "PPP",
+                      "shGoals": "SHG",
+                      "shPoints": "SHP",
+                      "otGoals": "OTG",
+                      "gameWinningGoals": "GWG",
+                      "shots": "S",
+                      "shootingPct": "S%",
+                      "timeOnIcePerGame": "TOI/GP",
+                      "faceoffWinPct": "FOW%"}
+
+# HTTP status codes worth retrying - rate limiting and transient server errors.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def get_page_urls(base_url, total, page_size, start=0, query=None):
+    """Get URLs of the stats API pages holding rows start to total, page_size rows per page.
+
+    The query defaults to STATS_API_QUERY - all-time totals.
+    """
+    if query is None:
+        query = STATS_API_QUERY
+
+    return [f"{base_url}?{urlencode({**query, 'start': page_start, 'limit': page_size})}"
+            for page_start in range(start, total, page_size)]
+
+
+def get_connection_pool():
+    """Generate an empty connection pool - a dict of per-thread connections, and a list of all connections opened."""
+    return {"local": threading.local(), "opened": [], "lock": threading.Lock()}
+
+
+def get_connection(pool, url, timeout):
+    """Get this thread's open connection to the host of url from the pool, opening one if needed.
+
+    Each worker thread keeps one persistent connection per host, so pages are fetched without a new TCP/TLS handshake
+    per request.
+    """
+    scheme, netloc = urlsplit(url)[:2]
+    connections = pool["local"].__dict__.setdefault("connections", {})
+
+    if (scheme, netloc) not in connections:
+        connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        connections[(scheme, netloc)] = connection_class(netloc, timeout=timeout)
+        with pool["lock"]:
+            pool["opened"].append(connections[(scheme, netloc)])
+
+    return connections[(scheme, netloc)]
+
+
+def close_connection(pool, url):
+    """Close and discard this thread's connection to the host of url, after an error."""
+    connection = pool["local"].__dict__.get("connections", {}).pop(tuple(urlsplit(url)[:2]), None)
+    if connection is not None:
+        connection.close()
+
+
+def close_connections(pool):
+    """Close every connection opened from the pool, by any thread, once all fetches are done."""
+    with pool["lock"]:
+        for connection in pool["opened"]:
+            connection.close()
+        pool["opened"].clear()
+
+
+def fetch_url(url, pool, retries=3, backoff=0.5, timeout=30):
+    """Fetch url over a pooled connection, retrying connection errors and retryable statuses with exponential backoff.
+
+    :param url: URL to fetch
+    :param pool: connection pool from get_connection_pool()
+    :param retries: number of retries after the first attempt
+    :param backoff: seconds to wait before the first retry, doubled for each further retry
+    :param timeout: connection timeout in seconds
+    :return: response body as bytes
+    """
+    parts = urlsplit(url)
+    path = f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+    for attempt in range(retries + 1):
+        try:
+            connection = get_connection(pool, url, timeout)
+            connection.request("GET", path, headers={"Accept": "application/json, text/csv"})
+            response = connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException) as connection_error:
+            close_connection(pool, url)
+            error = connection_error
+        else:
+            if response.status == 200:
+                return body
+
+            error = http.client.HTTPException(f"HTTP {response.status} fetching {url}")
+            if response.status not in RETRY_STATUSES:
+                raise error
+
+        if attempt < retries:
+            time.sleep(backoff * 2 ** attempt)
+
+    raise error
+
+
+def fetch_url_cached(url, pool, cache_dir=None, **kwargs):
+    """Fetch url with fetch_url(), reusing the response saved in cache_dir if the same URL was fetched before.
+
+    Responses are saved under a hash of the URL. No caching is done if cache_dir is None. Returns response body as
+    bytes.
+    """
+    if cache_dir is None:
+        return fetch_url(url, pool, **kwargs)
+
+    cache_path = os.path.join(cache_dir, f"{hashlib.sha256(url.encode()).hexdigest()[:16]}.response")
+
+    if os.path.exists(cache_path):
+        with open(cache_path, "rb") as in_file:
+            return in_file.read()
+
+    body = fetch_url(url, pool, **kwargs)
+
+    # Write to a temporary file first, so an interrupted run does not leave a partial response in the cache.
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(f"{cache_path}.{threading.get_ident()}.tmp", "wb") as out_file:
+        out_file.write(body)
+    os.replace(f"{cache_path}.{threading.get_ident()}.tmp", cache_path)
+
+    return body
+
+
+def parse_page(body):
+    """Parse a stats API page, as JSON ({"data": [...], "total": n}) or CSV. Returns DataFrame and total row count.
+
+    The total is None for CSV pages, which do not carry it. An empty body is an empty page.
+    """
+    if not body.strip():
+        return pd.DataFrame(), None
+
+    if body.lstrip()[:1] == b"{":
+        page = json.loads(body)
+        return pd.DataFrame(page["data"]), page.get("total")
+
+    return pd.read_csv(io.BytesIO(body)), None
+
+
+def to_summary_report(df_api, keep_id=False):
+    """Convert stats API rows to the columns and units of the Excel Summary report, for clean_dataset().
+
+    Percentages are scaled from fractions to percent, time on ice from seconds to 'm:ss', and missing values are kept as
+    NaN. Returns DataFrame with the columns of the Excel export, in order, preceded by the API's 'Player ID' column if
+    keep_id is True.
+    """
+    fields = {"playerId": "Player ID", **SUMMARY_API_FIELDS} if keep_id else SUMMARY_API_FIELDS
+    df_nhl = df_api.reindex(columns=list(fields)).rename(columns=fields)
+
+    df_nhl["S%"] = (df_nhl["S%"] * 100).round(1)
+    df_nhl["FOW%"] = (df_nhl["FOW%"] * 100).round(1)
+
+    seconds = df_nhl["TOI/GP"].round()
+    minutes = (seconds // 60).astype("Int64").astype("string")
+    df_nhl["TOI/GP"] = (minutes + ":" + (seconds % 60).astype("Int64").astype("string").str.zfill(2)).astype("object")
+
+    return df_nhl.reset_index(drop=True)
+
+
+def get_dataset_api(source=STATS_API_URL, page_size=1000, max_workers=8, cache_dir="./Cache/API/", retries=3,
+                    query=None, keep_id=False):
+    """Generate Pandas DataFrame of the Summary report from the NHL.com stats API, without Excel downloads.
+
+    The first page is fetched to get the total row count, and the remaining pages are fetched concurrently by
+    max_workers threads, each keeping a persistent connection. CSV pages carry no total, so they are fetched max_workers
+    pages at a time, until a page with fewer than page_size rows is reached. Responses are cached in cache_dir (None to
+    disable), so re-runs read from disk. If source is a local directory instead of a URL, pages are read from its
+    Summary*.json and Summary*.csv fixture files, in order of file name. The query defaults to all-time totals, and
+    keep_id is passed to to_summary_report(). Returns DataFrame in the format of get_dataset_excel().
+    """
+    if os.path.isdir(source):
+        print(f"Compiling dataframe from Summary fixture files in {source}...")
+        files = sorted(glob(os.path.join(source, "Summary*.json")) + glob(os.path.join(source, "Summary*.csv")))
+        df_pages = []
+        for file in files:
+            print(file)
+            with open(file, "rb") as in_file:
+                df_pages.append(parse_page(in_file.read())[0])
+    else:
+        print(f"Compiling dataframe from stats API - {source}...")
+        pool = get_connection_pool()
+
+        def fetch_page(url):
+            return parse_page(fetch_url_cached(url, pool, cache_dir, retries=retries))[0]
+
+        try:
+            first_url = get_page_urls(source, 1, page_size, query=query)[0]
+            df_first, total = parse_page(fetch_url_cached(first_url, pool, cache_dir, retries=retries))
+            df_pages = [df_first]
+
+            # Pool of threads, each with its own connection - requests are I/O bound.
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                if total is not None:
+                    df_pages += list(executor.map(fetch_page, get_page_urls(source, total, page_size, start=page_size,
+                                                                            query=query)))
+                else:
+                    while len(df_pages[-1]) == page_size:
+                        start = len(df_pages) * page_size
+                        page_urls = get_page_urls(source, start + max_workers * page_size, page_size, start=start,
+                                                  query=query)
+                        for df_page in executor.map(fetch_page, page_urls):
+                            df_pages.append(df_page)
+                            if len(df_page) < page_size:
+                                break
+        finally:
+            close_connections(pool)
+
+    print(f"\nPages parsed: {len(df_pages)}\n")
+
+    # Empty pages (the last CSV page, when the rows fill whole pages) would make every column object-typed.
+    df_pages = [df_page for df_page in df_pages if len(df_page)]
+    if len(df_pages) == 0:
+        df_pages = [pd.DataFrame()]
+
+    return to_summary_report(pd.concat(df_pages), keep_id)
+
+
+if __name__ == '__main__':
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs
+    from clean_dataset import clean_dataset
+
+    # Fixture rows in the format of the stats API.
+    rng = np.random.default_rng(1)
+    n_players = 2500
+    games_played = rng.integers(1, 1800, n_players)
+    goals = rng.binomial(games_played, 0.2)
+    assists = rng.binomial(games_played, 0.3)
+    shots = goals + rng.poisson(games_played)
+    df_fixture = pd.DataFrame({"skaterFullName": [f"Player {i}" for i in range(n_players)],
+                               "shootsCatches": rng.choice(["L", "R"], n_players),
+                               "positionCode": rng.choice(["C", "L", "R", "D"], n_players),
+                               "gamesPlayed": games_played,
+                               "goals": goals,
+                               "assists": assists,
+                               "points": goals + assists,
+                               "plusMinus": rng.integers(-100, 100, n_players),
+                               "penaltyMinutes": rng.binomial(games_played, 0.8),
+                               "pointsPerGame": (goals + assists) / games_played,
+                               "evGoals": goals,
+                               "evPoints": goals + assists,
+                               "ppGoals": 0,
+                               "ppPoints": 0,
+                               "shGoals": 0,
+                               "shPoints": 0,
+                               "otGoals": 0,
+                               "gameWinningGoals": rng.binomial(goals, 0.15),
+                               "shots": shots,
+                               "shootingPct": goals / shots,
+                               "timeOnIcePerGame": np.where(rng.random(n_players) < 0.5, np.nan, 1000.0),
+                               "faceoffWinPct": None})
+    records = json.loads(df_fixture.to_json(orient="records"))
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        """Serve fixture records as stats API pages, paged by the start and limit query parameters."""
+
+        def do_GET(self):
+            query = parse_qs(urlsplit(self.path).query)
+            start, limit = int(query["start"][0]), int(query["limit"][0])
+            if urlsplit(self.path).path.endswith(".csv"):
+                body = df_fixture.iloc[start:start + limit].to_csv(index=False).encode()
+            else:
+                body = json.dumps({"data": records[start:start + limit], "total": len(records)}).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as test_dir:
+        fixture_url = f"http://127.0.0.1:{server.server_address[1]}/stats/rest/en/skater/summary"
+        df_api = get_dataset_api(fixture_url, page_size=500, cache_dir=os.path.join(test_dir, "cache"))
+        print(df_api, "\n")
+
+        # CSV pages, without a total, are fetched until a short page.
+        df_api_csv = get_dataset_api(f"{fixture_url}.csv", page_size=500, max_workers=2, cache_dir=None)
+        print(len(df_api_csv), df_api_csv["Player"].equals(df_api["Player"]), "\n")
+
+        # Second run is read from the response cache, with the server stopped.
+        server.shutdown()
+        df_api_cached = get_dataset_api(fixture_url, page_size=500, cache_dir=os.path.join(test_dir, "cache"))
+        print(df_api.equals(df_api_cached), "\n")
+
+        # Pages saved as fixture files give the same result.
+        for i, start in enumerate(range(0, n_players, 1000)):
+            with open(os.path.join(test_dir, f"Summary-{i:02d}.json"), "w") as out_file:
+                json.dump({"data": records[start:start + 1000], "total": n_players}, out_file)
+        print(df_api.equals(get_dataset_api(test_dir)), "\n")
+
+        df_clean, null_count = clean_dataset(df_api)
+        print(df_clean.dtypes, "\n")
+        print(null_count, "\n")
@@ -2,10 +2,11 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 
 
-def get_p_histogram(df_nhl):
+def get_p_histogram(df_nhl, show=True):
     """Genarate o 1 x 2 figure of histogram plots for Points by all players in the dataset.
 
-    Takes DataFrame object as input, and plots histogram. The second plots zooms the first.
+    Takes DataFrame object as input, and plots histogram. The second plots zooms the first. Output is saved to file and
+    displayed on screen, or closed without display if show is False.
     """
     # Plot histogram of P.
     f, axs = plt.subplots(1, 2)
@@ -21,4 +22,7 @@ def get_p_histogram(df_nhl):
     axs[1].set(ylabel="Player Count")
 
     plt.savefig("Points Histogram.png")
-    plt.show()
\ No newline at end of file
+    if show:
+        plt.show()
+    else:
+        plt.close()
@@ -2,10 +2,11 @@ import  matplotlib.pyplot as plt
 import seaborn as sns
 
 
-def get_p_pos_boxplot(df_nhl):
+def get_p_pos_boxplot(df_nhl, show=True):
     """Generate a 1 x 3 figure of box plots for Points by Position.
 
-    Takes DataFrame object as argument, and plots for all rows. Output is saved to file and displayed on screen.
+    Takes DataFrame object as argument, and plots for all rows. Output is saved to file and displayed on screen, or
+    closed without display if show is False.
     """
     # Set up figure for multiple plots.
     fig, axs = plt.subplots(1, 3)
@@ -31,4 +32,7 @@ def get_p_pos_boxplot(df_nhl):
     axs[2].set(ylabel="Points")
 
     plt.savefig("P vs. Pos Box Plot.png")
-    plt.show()
+    if show:
+        plt.show()
+    else:
+        plt.close()
@@ -1,49 +1,116 @@
 import matplotlib.pyplot as plt
 import seaborn as sns
+import numpy as np
 
 
-def get_pga_scatterplot(df_nhl):
+def plot_points(x, y, color, label, ax, max_points):
+    """Plot y vs. x as a scatter plot, or as a hexbin density plot if there are more than max_points points."""
+    if len(x) > max_points:
+        # Colour map matching the scatter plot colour, with log-scaled counts per hexagon.
+        cmaps = {'b': 'Blues', 'r': 'Reds', 'g': 'Greens'}
+        ax.hexbin(x, y, gridsize=100, bins='log', mincnt=1, cmap=cmaps.get(color, 'viridis'), label=label)
+    else:
+        sns.scatterplot(x=x, y=y, color=color, alpha=0.5, label=label, ax=ax)
+
+
+def select_outliers(x, y, n_labels):
+    """Select points to annotate - the n_labels points furthest above the linear trend of y vs. x, and the max x point.
+
+    Selection is vectorised, and linear in the number of points. Returns array of point positions, in order of
+    priority - empty if there are no points.
+    """
+    if len(x) == 0 or n_labels <= 0:
+        return np.array([], dtype="int64")
+
+    slope, intercept = np.polyfit(x, y, 1)
+    residuals = y - (slope * x + intercept)
+
+    n_labels = min(n_labels, len(x))
+    positions = np.argpartition(-residuals, n_labels - 1)[:n_labels]
+    positions = positions[np.argsort(-residuals[positions])]
+
+    if np.argmax(x) not in positions:
+        positions = np.append(positions, np.argmax(x))
+
+    return positions
+
+
+def annotate_outliers(ax, df_nhl, x_col, y_col, n_labels=5):
+    """Annotate outlying points of a plot with player names, skipping labels that would overlap.
+
+    Points are selected with select_outliers(). Each label is placed at the first of a set of offsets from its point
+    that does not overlap a label already placed. Placed labels are held in a grid of label-sized cells, so each check
+    only compares labels in neighbouring cells. Nothing is annotated if df_nhl has no Player column.
+    """
+    if "Player" not in df_nhl.columns:
+        return
+
+    positions = select_outliers(df_nhl[x_col].to_numpy(dtype="float64"), df_nhl[y_col].to_numpy(dtype="float64"),
+                                n_labels)
+
+    # Estimate label size in data units, from the axis ranges.
+    (x_min, x_max), (y_min, y_max) = ax.get_xlim(), ax.get_ylim()
+    char_width = (x_max - x_min) * 0.008
+    height = (y_max - y_min) * 0.08
+    cell_width = char_width * 16
+
+    placed = {}
+    for position in positions:
+        name = df_nhl["Player"].iloc[position]
+        x, y = df_nhl[x_col].iloc[position], df_nhl[y_col].iloc[position]
+        width = len(name) * char_width
+
+        for dx, dy in [(0, 0), (0, height), (0, -height), (-width, 0), (-width, height)]:
+            box = (x + dx, y + dy, x + dx + width, y + dy + height)
+            cells = [(i, j) for i in range(int(box[0] // cell_width), int(box[2] // cell_width) + 1)
+                     for j in range(int(box[1] // height), int(box[3] // height) + 1)]
+
+            if not any(box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]
+                       for cell in cells for other in placed.get(cell, [])):
+                ax.text(box[0], box[1], name)
+                for cell in cells:
+                    placed.setdefault(cell, []).append(box)
+                break
+
+
+def get_pga_scatterplot(df_nhl, show=True, max_points=100000, n_labels=5):
     """Generate a 3 x 1 figure of scatter plots for Points, Goals, and Assists vs. Games Played.
 
-    Takes DataFrame object as argument, plots features for all rows, and annotates with player names. Output is saved
-    to file and displayed on screen.
+    Takes DataFrame object as argument, plots features for all rows, and annotates with the names of the n_labels
+    players furthest above the trend, and the player with most games played. Above max_points rows, hexbin density
+    plots are drawn instead of scatter plots. Output is saved to file and displayed on screen, or closed without display
+    if show is False.
     """
     # Generate figure for subplots.
     fig, axs = plt.subplots(3, 1)
     fig.suptitle('Career Points/Goals/Assists vs. Games Played - Regular Season')
 
     # Plot Points vs. Games Played on subplot 0.
-    sns.scatterplot(x=df_nhl['GP'], y=df_nhl['P'], color='b', alpha=0.5, label='Points', ax=axs[0])
+    plot_points(df_nhl['GP'], df_nhl['P'], 'b', 'Points', axs[0], max_points)
     axs[0].set(xlabel='Games Played')
     axs[0].set(ylabel='Count')
     axs[0].set_yticks(range(0, 3500, 500))
     axs[0].legend(loc='upper left')
-    axs[0].text(1487, 2857, "Wayne Gretzky")
-    axs[0].text(1779, 1197, "Patrick Marleau")
-    axs[0].text(915, 1723, "Mario Lemieux")
-    axs[0].text(752, 1126, "Mike Bossy")
-    axs[0].text(1274, 1410, "Alex Ovechkin")
-    axs[0].text(1108, 1409, "Sidney Crosby")
+    annotate_outliers(axs[0], df_nhl, 'GP', 'P', n_labels)
 
     # Plot Goals vs. Games Played on subplot 1.
-    sns.scatterplot(x=df_nhl['GP'], y=df_nhl['G'], color='r', alpha=0.5, label='Goals', ax=axs[1])
+    plot_points(df_nhl['GP'], df_nhl['G'], 'r', 'Goals', axs[1], max_points)
     axs[1].set(xlabel='Games Played')
     axs[1].set(ylabel='Count')
     axs[1].set_yticks(range(0, 3500, 500))
     axs[1].legend(loc='upper left')
-    axs[1].text(1487, 894, "Wayne Gretzky")
-    axs[1].text(1767, 801, "Gordie Howe")
-    axs[1].text(1274, 780, "Alex Ovechkin")
+    annotate_outliers(axs[1], df_nhl, 'GP', 'G', n_labels)
 
     # Plot Assists vs. Games Played on subplot 2.
-    sns.scatterplot(x=df_nhl['GP'], y=df_nhl['A'], color='g', alpha=0.5, label='Assists', ax=axs[2])
+    plot_points(df_nhl['GP'], df_nhl['A'], 'g', 'Assists', axs[2], max_points)
     axs[2].set(xlabel='Games Played')
     axs[2].set(ylabel='Count')
     axs[2].set_yticks(range(0, 3500, 500))
     axs[2].legend(loc='upper left')
-    axs[2].text(1487, 1963, "Wayne Gretzky")
-    axs[2].text(1731, 1249, "Ron Francis")
-    axs[2].text(1756, 1193, "Mark Messier")
+    annotate_outliers(axs[2], df_nhl, 'GP', 'A', n_labels)
 
     plt.savefig("P-G-A vs. Games Played Scatter Plot.png")
-    plt.show()
+    if show:
+        plt.show()
+    else:
+        plt.close()
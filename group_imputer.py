@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.utils.validation import check_is_fitted
+from handle_missing_data import fit_imputer, transform_imputer
+
+
+class GroupImputer(BaseEstimator, TransformerMixin):
+    """Impute missing values with fit_imputer() and transform_imputer(), as a scikit-learn transformer.
+
+    Takes DataFrame input. If strategies is None, all columns other than the groupby columns are imputed with the mean.
+    Group columns are dropped from the output if drop_groups is True, so the imputer can precede an estimator in a
+    Pipeline.
+    """
+
+    def __init__(self, strategies=None, groupby=None, drop_groups=True):
+        self.strategies = strategies
+        self.groupby = groupby
+        self.drop_groups = drop_groups
+
+    def fit(self, X, y=None):
+        groupby = self.groupby or []
+        strategies = self.strategies
+        if strategies is None:
+            strategies = {col: "mean" for col in X.columns if col not in groupby}
+
+        self.statistics_ = fit_imputer(X, strategies, self.groupby)
+        self.feature_names_in_ = np.asarray(X.columns, dtype="object")
+
+        return self
+
+    def transform(self, X):
+        check_is_fitted(self, "statistics_")
+        df = transform_imputer(X, self.statistics_)
+
+        if self.drop_groups and self.groupby:
+            df = df.drop(columns=self.groupby)
+
+        return df
+
+    def get_feature_names_out(self, input_features=None):
+        check_is_fitted(self, "statistics_")
+        groupby = self.groupby if self.drop_groups and self.groupby else []
+
+        return np.asarray([col for col in self.feature_names_in_ if col not in groupby], dtype="object")
+
+
+if __name__ == '__main__':
+    from sklearn.pipeline import make_pipeline
+    from sklearn.tree import DecisionTreeRegressor
+
+    df_test = pd.DataFrame({"Pos": ["C", "C", "C", "D", "D", "D", "L"],
+                            "EVG": [10, np.nan, 20, 2, 4, np.nan, np.nan],
+                            "PPG": [4, 2, np.nan, np.nan, np.nan, np.nan, 1]})
+
+    # Test GroupImputer in a scikit-learn Pipeline.
+    pipeline = make_pipeline(GroupImputer(groupby=["Pos"]), DecisionTreeRegressor(random_state=1))
+    pipeline.fit(df_test, [5, 6, 7, 1, 2, 3, 4])
+    print(pipeline[0].transform(df_test))
+    print(pipeline.predict(df_test))
@@ -33,6 +33,79 @@ def impute_with_mean(series):
     return series
 
 
+def get_group_modes(df, cols, groupby):
+    """Get the mode of each column in cols, per group of the groupby columns, without a Python call per group.
+
+    Value counts are computed for all groups at once, and ties are broken on the smallest value, as Series.mode().
+    Returns DataFrame of modes, indexed by group.
+    """
+    modes = {}
+    for col in cols:
+        # Counts are sorted by group and value - a stable sort on count keeps the smallest value first within ties.
+        counts = df.groupby(groupby + [col], observed=True).size().sort_values(ascending=False, kind="stable")
+        groups = counts.index.droplevel(col)
+        counts = counts[~groups.duplicated()]
+        modes[col] = pd.Series(counts.index.get_level_values(col), index=counts.index.droplevel(col))
+
+    return pd.DataFrame(modes)
+
+
+def fit_imputer(df, strategies, groupby=None):
+    """Compute imputation statistics for many columns in one call, globally and optionally per group.
+
+    Means are computed for all 'mean' columns in a single vectorised pass. If groupby is given, statistics are also
+    computed per group (e.g. per 'Pos'), and the global statistics are kept as the fallback for groups with no values
+    in a column, or groups not seen when fitting. Returns dict of statistics, to be passed to transform_imputer().
+    :param df: DataFrame with missing values as NaN/NA
+    :param strategies: dict of column name to 'mean' or 'mode'
+    :param groupby: list of column names to group by, or None for global statistics only
+    :return: dict of 'strategies', 'groupby', 'global' (Series of statistic per column) and 'group' (DataFrame of
+    statistic per group and column, or None)
+    """
+    mean_cols = [col for col, strategy in strategies.items() if strategy == "mean"]
+    mode_cols = [col for col, strategy in strategies.items() if strategy == "mode"]
+
+    global_modes = {}
+    for col in mode_cols:
+        mode = df[col].mode()
+        global_modes[col] = mode.iloc[0] if len(mode) > 0 else np.nan
+
+    statistics = {"strategies": dict(strategies),
+                  "groupby": groupby,
+                  "global": pd.concat([df[mean_cols].mean().astype("object"), pd.Series(global_modes, dtype="object")]),
+                  "group": None}
+
+    if groupby:
+        statistics["group"] = pd.concat([df.groupby(groupby, observed=True)[mean_cols].mean(),
+                                         get_group_modes(df, mode_cols, groupby)], axis=1)
+
+    return statistics
+
+
+def transform_imputer(df, statistics):
+    """Fill missing values with statistics from fit_imputer(), without recomputing them.
+
+    Per-group statistics are aligned to the rows of df in one reindex, and any values still missing are filled with
+    the global statistics. Returns DataFrame with imputed columns.
+    """
+    cols = list(statistics["strategies"])
+    df_filled = df[cols]
+
+    if statistics["groupby"]:
+        groupby = statistics["groupby"]
+        keys = pd.MultiIndex.from_frame(df[groupby]) if len(groupby) > 1 else pd.Index(df[groupby[0]])
+        df_group_statistics = statistics["group"].reindex(keys)
+        df_group_statistics.index = df.index
+        df_filled = df_filled.fillna(df_group_statistics[cols])
+
+    df_filled = df_filled.fillna(statistics["global"][cols])
+
+    df = df.copy()
+    df[cols] = df_filled
+
+    return df
+
+
 if __name__ == '__main__':
     # Test replace_with_nan().
     df_test = pd.DataFrame({"col_1": [1, 2, "--", 4],
@@ -55,4 +128,20 @@ if __name__ == '__main__':
     print(df_test)
 
     df_mean = impute_with_mean(df_test["col_1"])
-    print(df_mean)
\ No newline at end of file
+    print(df_mean)
+
+    # Test fit_imputer() and transform_imputer() - EVG and PPG means, and S/C mode, per position.
+    df_test = pd.DataFrame({"Pos": ["C", "C", "C", "D", "D", "D", "L"],
+                            "S/C": ["L", "R", np.nan, "R", "R", np.nan, np.nan],
+                            "EVG": [10, np.nan, 20, 2, 4, np.nan, np.nan],
+                            "PPG": [4, 2, np.nan, np.nan, np.nan, np.nan, 1]})
+    print(df_test)
+
+    statistics_test = fit_imputer(df_test, {"EVG": "mean", "PPG": "mean", "S/C": "mode"}, groupby=["Pos"])
+    print(statistics_test["global"])
+    print(statistics_test["group"])
+
+    # Statistics are reused on new data - unseen group 'R' falls back to the global statistics.
+    print(transform_imputer(df_test, statistics_test))
+    print(transform_imputer(pd.DataFrame({"Pos": ["D", "R"], "S/C": [np.nan, np.nan], "EVG": [np.nan, np.nan],
+                                          "PPG": [np.nan, np.nan]}), statistics_test))
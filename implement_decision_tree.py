@@ -1,10 +1,9 @@
-from sklearn.model_selection import train_test_split
 from sklearn.tree import DecisionTreeRegressor
-from sklearn.model_selection import cross_val_score
 from sklearn.metrics import mean_squared_error as MSE
+import experiment_context
 
 
-def implement_decision_tree(X, y, SEED):
+def implement_decision_tree(X, y, SEED, context=None):
     """Use a DecisionTreeRegressor model to predict target variable y , based on feature matrix X.
 
     Takes below parameters and implements Decision Tree Regression. Prints RMSE of cross-validation on the training,
@@ -12,25 +11,23 @@ def implement_decision_tree(X, y, SEED):
     :param X: feature matrix, numpy ndaarray object
     :param y: target, numpy ndarrray  object
     :param SEED: seed for random number generation
+    :param context: experiment context from experiment_context.get_experiment_context(), shared between models
     :return: none
     """
     # Define test and training data for DecisionTreeRegressor.
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=SEED)
+    if context is None:
+        context = experiment_context.get_experiment_context(len(X), SEED)
+
+    X_train, X_test, y_train, y_test = experiment_context.get_split(context, X, y)
 
     # Instantiate machine learning model - DecisionTreeRegressor.
     dt = DecisionTreeRegressor(max_depth=4, min_samples_leaf=0.14, random_state=SEED)
 
     # Perform k-fold cross-validation to determine bias and variance.
-    MSE_CV = - cross_val_score(dt, X_train, y_train, cv=10,
-                               scoring="neg_mean_squared_error",
-                               n_jobs=-1)
-
-    # Fit model to training data
-    dt.fit(X_train, y_train)
+    MSE_CV = experiment_context.cross_val_mse_cached(context, dt, X, y, 10)
 
-    # Predict the labels of the test and training sets.
-    y_pred_train = dt.predict(X_train)
-    y_pred_test = dt.predict(X_test)
+    # Fit model to training data, and predict the labels of the test and training sets.
+    dt, y_pred_train, y_pred_test = experiment_context.fit_predict_cached(context, dt, X, y)
 
     print(f"CV MSE: {MSE_CV.mean()}")
     print(f"Train MSE: {MSE(y_train, y_pred_train)}")
@@ -0,0 +1,116 @@
+import os
+from sklearn.ensemble import HistGradientBoostingRegressor
+import numpy as np
+from sklearn.metrics import mean_squared_error as MSE
+import pandas as pd
+import matplotlib.pyplot as plt
+import experiment_context
+import feature_importance
+
+# Rows copied from the source array to a memory-mapped store at a time.
+MMAP_CHUNK_ROWS = 65536
+
+
+def get_memmap(X, rows, mmap_dir, name, chunk_rows=MMAP_CHUNK_ROWS):
+    """Copy rows of X to <mmap_dir>/<name>.npy, and reopen it memory-mapped, read-only.
+
+    The file is created with np.lib.format.open_memmap, and filled from X chunk_rows rows at a time, so no more than
+    one chunk of the selected rows is held in memory. Rows are stored as float64, the dtype HGB fits on, so fitting does
+    not convert them again. Returns numpy memmap of the rows, in the order of rows.
+    """
+    os.makedirs(mmap_dir, exist_ok=True)
+    mmap_file = os.path.join(mmap_dir, f"{name}.npy")
+
+    store = np.lib.format.open_memmap(mmap_file, mode="w+", dtype="float64", shape=(len(rows), X.shape[1]))
+    for start in range(0, len(rows), chunk_rows):
+        store[start:start + chunk_rows] = X[rows[start:start + chunk_rows]]
+    store.flush()
+    del store
+
+    return np.load(mmap_file, mmap_mode="r")
+
+
+def implement_gradient_boosting(X, y, SEED, df_X, target, context=None, show=True, mmap_dir=None):
+    """Use a histogram-based Gradient Boosting Regressor to predict target variable y, based on feature matrix X.
+
+    Takes below parameters and implements Gradient Boosting Regression on features binned into at most 255 bins, with
+    early stopping on a validation split of the training set. Displays RMSE of the prediction, and generates bar chart
+    of feature importance, as the mean increase in MSE on the test set when each feature is permuted. The plot is saved
+    to file and displayed on screen. The HGB regression model is returned.
+    :param X: feature matrix, numpy ndarray object
+    :param y: target, 1d numpy ndarray object
+    :param SEED: seed for random number generation
+    :param df_X: X as DataFrame object
+    :param target: target name, string
+    :param context: experiment context from experiment_context.get_experiment_context(), shared between models
+    :param show: if False, the plot is saved to file without display, and closed
+    :param mmap_dir: if given, training and test rows are streamed to a memory-mapped file in this directory, and the
+    model is fitted and evaluated on slices of it, without in-memory copies of the training and test sets. HGB's own
+    early stopping split still copies the training rows
+    :return: HistGradientBoostingRegressor object
+    """
+    if context is None:
+        context = experiment_context.get_experiment_context(len(X), SEED)
+
+    hgb = HistGradientBoostingRegressor(max_iter=1000, learning_rate=0.1, early_stopping=True,
+                                        validation_fraction=0.1, n_iter_no_change=20, random_state=SEED)
+
+    if mmap_dir is None:
+        X_train, X_test, y_train, y_test = experiment_context.get_split(context, X, y)
+        hgb, y_pred_train, y_pred = experiment_context.fit_predict_cached(context, hgb, X, y)
+    else:
+        # Training rows, then test rows, in one store - each set is a contiguous slice, read as a view of the file.
+        n_train = len(context["train"])
+        X_store = get_memmap(X, np.concatenate([context["train"], context["test"]]), mmap_dir, "X")
+        X_test = X_store[n_train:]
+        y_train, y_test = y[context["train"]], y[context["test"]]
+
+        hgb = hgb.fit(X_store[:n_train], y_train)
+        y_pred = hgb.predict(X_test)
+
+    print(f"Boosting iterations (early stopping): {hgb.n_iter_}")
+
+    RMSE_hgb_test = (MSE(y_test, y_pred) ** (1 / 2))
+    print(f"RMSE_test_hgb: {RMSE_hgb_test}", "\n")
+
+    # Plot feature importances - HistGradientBoostingRegressor has no impurity-based feature_importances_.
+    importances = pd.Series(data=feature_importance.get_importances_cached(hgb, X_test, y_test, "permutation",
+                                                                           SEED=SEED),
+                            index=df_X.columns)
+
+    importances_sorted = importances.sort_values()
+
+    importances_sorted.plot(kind='barh')
+    plt.title(f'Feature Importance in Prediction of {target} - Gradient Boosting')
+    plt.savefig(f"Feature Importance in Prediction of {target} - Gradient Boosting.png")
+    if show:
+        plt.show()
+    else:
+        plt.close()
+
+    return hgb
+
+
+if __name__ == '__main__':
+    import tempfile
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+    rng = np.random.default_rng(1)
+    n_players = 200000
+    games_played = rng.integers(1, 1800, n_players)
+    shots = rng.binomial(games_played, 0.4)
+    df_test = pd.DataFrame({"GP": games_played,
+                            "S": shots,
+                            "PIM": rng.binomial(games_played, 0.8)})
+    y_test_target = rng.binomial(shots, 0.1).reshape(-1, 1)
+
+    with tempfile.TemporaryDirectory() as test_dir:
+        os.chdir(test_dir)
+        hgb_test = implement_gradient_boosting(df_test.values, y_test_target, 1, df_test, "G", show=False)
+        hgb_test_mmap = implement_gradient_boosting(df_test.values, y_test_target, 1, df_test, "G", show=False,
+                                                    mmap_dir=os.path.join(test_dir, "mmap"))
+
+        # Fitting from the memory-mapped file gives the same model.
+        print(np.array_equal(hgb_test.predict(df_test.values[:1000]), hgb_test_mmap.predict(df_test.values[:1000])))
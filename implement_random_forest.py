@@ -1,45 +1,57 @@
-from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
-import numpy as np
 from sklearn.metrics import mean_squared_error as MSE
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+import experiment_context
+import feature_importance
 
 
-def implement_random_forest(X, y, SEED, df_X, target):
+def implement_random_forest(X, y, SEED, df_X, target, context=None, show=True, importance="impurity"):
     """Use a RandomForest Regressor model to predict target variable y , based on feature matrix X.
 
     Takes below parameters and implements RandomForset Regression. Displays RMSE of the prediction, and generates bar
     chart of feature importance. The plot is saved to file and displayed on screen. The RF regression model is returned.
     :param X: feature matrix, numpy ndaarray object
-    :param y: target, numpy ndarrray  object
+    :param y: target, 1d numpy ndarray object
     :param SEED: seed for random number generation
     :param df_X: X as DataFrame object
     :param target: target name, string
+    :param context: experiment context from experiment_context.get_experiment_context(), shared between models
+    :param show: if False, the plot is saved to file without display, and closed
+    :param importance: feature importance kind plotted - 'impurity', 'permutation' or 'attribution', computed on the
+    test set with feature_importance.get_importances_cached()
     :return: RandomForestRegressor object
     """
     # Implement ensembling with RandomForestRegressor.
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=SEED)
+    if context is None:
+        context = experiment_context.get_experiment_context(len(X), SEED)
+
+    X_train, X_test, y_train, y_test = experiment_context.get_split(context, X, y)
 
     rf = RandomForestRegressor(n_estimators=400, min_samples_leaf=0.12, random_state=SEED)
 
-    rf.fit(X_train, np.ravel(y_train))      # Using np.ravel() to convert from column-vector to 1d array, as prompted by
-                                            # DataConversionWarning.
-    y_pred = rf.predict(X_test)
+    rf, y_pred_train, y_pred = experiment_context.fit_predict_cached(context, rf, X, y)
 
     RMSE_rf_test = (MSE(y_test, y_pred) ** (1 / 2))
     print(f"RMSE_test_rf: {RMSE_rf_test}", "\n")
 
     # Plot feature importances.
-    importances = pd.Series(data=rf.feature_importances_,
+    importances = pd.Series(data=feature_importance.get_importances_cached(rf, X_test, y_test, importance),
                             index=df_X.columns)
 
     importances_sorted = importances.sort_values()
 
+    title = f"Feature Importance in Prediction of {target} - Untuned Random Forest"
+    if importance != "impurity":
+        title += f" ({importance.capitalize()})"
+
     importances_sorted.plot(kind='barh')
-    plt.title(f'Feature Importance in Prediction of {target} - Untuned Random Forest')
-    plt.savefig(f"Feature Importance in Prediction of {target} - Untuned Random Forest.png")
-    plt.show()
+    plt.title(title)
+    plt.savefig(f"{title}.png")
+    if show:
+        plt.show()
+    else:
+        plt.close()
 
     return rf
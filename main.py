@@ -1,214 +1,259 @@
 # Main file for implementation of data analytics on NHL player dataset - 0001-7461.csv.
 
+import sys
+import time
+import cli
+
+START_TIME = time.perf_counter()
+
+# Run a single stage with a subcommand, e.g. 'python main.py summarise --player "Wayne Gretzky"'. Stages import only
+# the modules they need (see cli.py), so subcommands are dispatched before the full pipeline's imports below.
+if __name__ == '__main__' and len(sys.argv) > 1:
+    sys.exit(cli.main(START_TIME))
+
 import pandas as pd
 from get_dataset import get_dataset_excel
-from summarise_dataset import summarise_dataset
+import dataset_cache
+from summarise_dataset import summarise_dataset, describe_dataset
 from check_for_duplicates import check_for_duplicates
-from find_and_replace import find_and_replace
-import handle_missing_data
+from clean_dataset import clean_dataset
+import player_index
+import merge_bio
+import matplotlib
 import seaborn as sns
 from get_pga_scatterplot import get_pga_scatterplot
 from get_p_pos_boxplot import get_p_pos_boxplot
 from get_p_histogram import get_p_histogram
+import render_plots
+from sklearn.tree import DecisionTreeRegressor
 from implement_decision_tree import implement_decision_tree
+from feature_subset_search import search_feature_subsets
 from implement_random_forest import implement_random_forest
+from implement_gradient_boosting import implement_gradient_boosting
 from tune_random_forest import tune_random_forest
+import experiment_context
+import feature_store
+import model_service
+import profile_stages
 
 
 SEED = 1
 
+# Display plots on screen. Set to False for unattended runs - plots are then rendered in worker processes and saved to
+# file without display, while the pipeline continues.
+SHOW_PLOTS = True
+
+# Run each pipeline stage under cProfile, saving stats to ./Profiles/. Stage timings are always recorded.
+PROFILE_STAGES = False
+
 # Don't suppress columns in terminal output.
 pd.options.display.width = 0
 pd.options.display.max_rows = 7461
 
 if __name__ == '__main__':
+    print(f"Startup time: {time.perf_counter() - START_TIME:.2f}s\n")
+
+    # Use non-interactive backend when plots are not displayed.
+    if not SHOW_PLOTS:
+        matplotlib.use("Agg")
+
+    # Record wall time, parent process CPU time, peak RSS and rows in/out of each stage.
+    profile = profile_stages.start_profile("./Profiles/" if PROFILE_STAGES else None)
+
     # Data Collection
-    # Compile dataframe from Excel files.
-    df_nhl = get_dataset_excel("./Raw Data Files/")
+    # Compile dataframe from Excel files, or load from cache if the files are unchanged.
+    with profile_stages.profile_stage(profile, "ingest") as stage:
+        df_nhl = dataset_cache.get_dataset_cached("./Raw Data Files/", parallel=True)
+        stage["rows_out"] = len(df_nhl)
 
     # Summarise dataset.
-    summarise_dataset(df_nhl)
+    with profile_stages.profile_stage(profile, "summarise", rows_in=len(df_nhl)) as stage:
+        summarise_dataset(df_nhl)
+        stage["rows_out"] = len(df_nhl)
 
     # Data Cleaning
-    # Check format of 4-digit value.
-    print("Checking format of 4-digit values...\n", df_nhl.loc[df_nhl['Player'] == 'Wayne Gretzky'], "\n")
-
-    # Use Regex to remove ',' from four-digit values, with capture groups.
-    df_nhl = find_and_replace(df_nhl, r"(\d),(\d)(\d)(\d)", r"\1\2\3\4")
-
-    # Check format of 4-digit value after replacement.
-    print("Checking format of 4-digit values...\n", df_nhl.loc[df_nhl['Player'] == 'Wayne Gretzky'], "\n")
-
-    # Sort dataframe by Points, Goals, and Assists and columns.
-    print("Sorting by P, G, A...\n")
-    df_nhl = df_nhl.sort_values(by=['P', 'G', 'A'], ascending=False).reset_index()
-
-    summarise_dataset(df_nhl)
-
-    # Check for duplicate rows.
-    check_for_duplicates(df_nhl)
-
-    # Handling Missing Data
-    # Explore missing data to determine how best to handle.
-    df_nhl, missing_count = handle_missing_data.replace_with_nan(df_nhl)
-    print("Getting df_nhl.head()...\n", df_nhl.head(), "\n")
-    print("Getting missing_count...\n", missing_count, "\n")
-
-    # S/C - Impute with mode.
-    df_nhl["S/C"] = handle_missing_data.impute_with_mode(df_nhl["S/C"])
-
-    # EVG, EVP, PPG, PPP, SHG, SHP - Impute with mean.
-    df_nhl["EVG"] = handle_missing_data.impute_with_mean(df_nhl["EVG"])
-    df_nhl["EVP"] = df_nhl["EVP"].astype("float64")                        # Intermediate type coversion to resolve
-                                                                           # TypeError on impute_with_mean().
-                                                                           # Include conversion in impute_with_mean()
-                                                                           # function definition?
-    df_nhl["EVP"] = handle_missing_data.impute_with_mean(df_nhl["EVP"])    # TypeError: can only concatenate str (not
-                                                                           # "int") to str
-    df_nhl["PPG"] = handle_missing_data.impute_with_mean(df_nhl["PPG"])
-    df_nhl["PPP"] = handle_missing_data.impute_with_mean(df_nhl["PPP"])
-    df_nhl["SHG"] = handle_missing_data.impute_with_mean(df_nhl["SHG"])
-    df_nhl["SHP"] = handle_missing_data.impute_with_mean(df_nhl["SHP"])
-
-    # S, S% - Impute with mean.
-    df_nhl["S"] = df_nhl["S"].astype("float64")
-    df_nhl["S"] = handle_missing_data.impute_with_mean(df_nhl["S"])        # TypeError: can only concatenate str (not
-                                                                           # "int") to str
-    df_nhl["S%"] = df_nhl["S%"].astype("float64")
-    df_nhl["S%"] = handle_missing_data.impute_with_mean(df_nhl["S%"])      # TypeError: can only concatenate str (not
-                                                                           # "int") to str
-
-    # TOI/GP, FOW % - Drop columns.
-    print("Dropping TOI/GP and FOW% columns...\n")
-    df_nhl = df_nhl.drop(["TOI/GP", "FOW%"], axis=1)
-
-    summarise_dataset(df_nhl)
-
-    # Convert data types.
-    print("Converting data types...\n")
-    df_nhl["Player"] = df_nhl["Player"].astype("string")
-    df_nhl["S/C"] = df_nhl["S/C"].astype("string")
-    df_nhl["Pos"] = df_nhl["Pos"].astype("string")
-    df_nhl["GP"] = df_nhl["GP"].astype("int64")
-    df_nhl["A"] = df_nhl["A"].astype("int64")
-    df_nhl["P"] = df_nhl["P"].astype("int64")
-    df_nhl["PIM"] = df_nhl["PIM"].astype("int64")
-    df_nhl["P/GP"] = df_nhl["P/GP"].astype("float64").round(2)
-    df_nhl["EVG"] = df_nhl["EVG"].astype("int64")
-    df_nhl["EVP"] = df_nhl["EVP"].astype("int64")
-    df_nhl["PPG"] = df_nhl["PPG"].astype("int64")
-    df_nhl["PPP"] = df_nhl["PPP"].astype("int64")
-    df_nhl["SHG"] = df_nhl["SHG"].astype("int64")
-    df_nhl["SHP"] = df_nhl["SHP"].astype("int64")
-    df_nhl["OTG"] = df_nhl["OTG"].astype("int64")
-    df_nhl["GWG"] = df_nhl["GWG"].astype("int64")
-    df_nhl["S"] = df_nhl["S"].astype("int64")
-    df_nhl["S%"] = df_nhl["S%"].astype("float64").round(1)
-
-    # Summarise dataset after cleaning.
-    summarise_dataset(df_nhl)
+    with profile_stages.profile_stage(profile, "clean", rows_in=len(df_nhl)) as stage:
+        # Reuse the cleaned dataframe cached by a previous run, if the input files are unchanged.
+        fingerprint = dataset_cache.get_fingerprint("./Raw Data Files/")
+        df_nhl_clean = dataset_cache.load_cached_dataset("./Cache/", "Summary", "clean", fingerprint)
+
+        if df_nhl_clean is not None:
+            df_nhl = df_nhl_clean
+        else:
+            # Check format of 4-digit value.
+            print("Checking format of 4-digit values...\n", df_nhl.loc[df_nhl['Player'] == 'Wayne Gretzky'], "\n")
+
+            # Parse ',' thousands separators and '--' missing values, impute, and convert data types in a single pass,
+            # per the schema in clean_dataset.py. TOI/GP and FOW% are dropped as mostly missing. Counts are downcast to
+            # the smallest integer type, and S/C and Pos are converted to categoricals.
+            df_nhl, missing_count = clean_dataset(df_nhl, compact=True)
+            print("Getting missing_count...\n", missing_count, "\n")
+
+            # Check format of 4-digit value after cleaning.
+            print("Checking format of 4-digit values...\n", df_nhl.loc[df_nhl['Player'] == 'Wayne Gretzky'], "\n")
+
+            # Sort dataframe by Points, Goals, and Assists and columns.
+            print("Sorting by P, G, A...\n")
+            df_nhl = df_nhl.sort_values(by=['P', 'G', 'A'], ascending=False).reset_index()
+
+            # Check for duplicate rows.
+            df_nhl = check_for_duplicates(df_nhl, fingerprint=True)
+
+            # Cache cleaned dataframe next to the raw dataframe.
+            dataset_cache.save_cached_dataset(df_nhl, "./Cache/", "Summary", "clean", fingerprint)
+
+        stage["rows_out"] = len(df_nhl)
+
+    # Summarise dataset after cleaning. Statistics are computed in one pass and cached, so the describe() below reuses
+    # them. The summary is also written to file as JSON, for reference without re-running the pipeline.
+    with profile_stages.profile_stage(profile, "summarise clean", rows_in=len(df_nhl)) as stage:
+        summarise_dataset(df_nhl, output_file="./Cache/Summary - clean.json")
+        stage["rows_out"] = len(df_nhl)
 
     # Exploratory Data Analysis
-    print("Getting df_nhl.describe(include='all')...\n", df_nhl.describe(include="all"), "\n")
-
-    # Extract standout players - per df_nhl.describe().
-    # Extract players responsible for max values - iterating over cols_max.
-    cols_max = ["GP", "G", "A", "P", "PIM", "P/GP", "EVG", "EVP", "PPG", "PPP", "SHG", "SHP", "OTG", "GWG", "S"]
-    for col in cols_max:
-        print(f"Getting player with most {col}...\n", df_nhl.loc[df_nhl[f"{col}"] == max(df_nhl[f"{col}"])], "\n")
-
-    # Eliminate players with insignificant shot totals from max. S% calculation.
-    df_significant_shots = df_nhl[df_nhl["S"] >= 100]
-
-    # Extract player with max. S% (with minimum of 100 shots taken).
-    print("Getting player with highest S% (min. 100 shots)...\n",
-          df_significant_shots.loc[df_significant_shots["S%"] == max(df_significant_shots["S%"])], "\n")
-
-    # Extract player with highest +/-.
-    print("Getting player with highest +/-...\n", df_nhl.loc[df_nhl["+/-"] == max(df_nhl["+/-"])], "\n")
-
-    # Extract player with lowest +/-.
-    print("Getting player with lowest +/-...\n", df_nhl.loc[df_nhl["+/-"] == min(df_nhl["+/-"])], "\n")
-
-    # Extract other noteworthy players, by name - using for loop.
-    notable_players_1 = ["Mario Lemieux", "Mike Bossy", "Gordie Howe",
-                       "Sidney Crosby", "Evgeni Malkin",
-                       "Nicklas Lidstrom", "Erik Karlsson", "Cale Makar"]
-    for name in notable_players_1:
-        print(f"Getting player {name}...\n", df_nhl.loc[df_nhl["Player"] == name], "\n")
-
-    # Extract other noteworthy players, by name - using iter()/next().
-    notable_players_2 = ["Connor McDavid", "Connor McDavid",    # Same value required twice for print statement using
-                       "Auston Matthews", "Auston Matthews"]    # iter()/next(). For loop preferred for this use case.
-    notable_players_2_iter = iter(notable_players_2)
-    print(f"Getting player {next(notable_players_2_iter)}...\n",
-          df_nhl.loc[df_nhl["Player"] == next(notable_players_2_iter)], "\n")
-    print(f"Getting player {next(notable_players_2_iter)}...\n",
-          df_nhl.loc[df_nhl["Player"] == next(notable_players_2_iter)], "\n")
+    with profile_stages.profile_stage(profile, "eda", rows_in=len(df_nhl)) as stage:
+        print("Getting df_nhl.describe(include='all')...\n", describe_dataset(df_nhl, include="all"), "\n")
+
+        # Extract standout players - per df_nhl.describe().
+        # Index players by name, and by max/min values, for repeated lookups.
+        cols_max = ["GP", "G", "A", "P", "PIM", "P/GP", "EVG", "EVP", "PPG", "PPP", "SHG", "SHP", "OTG", "GWG", "S"]
+        nhl_index = player_index.build_player_index(df_nhl, cols_max + ["+/-"])
+
+        # Extract players responsible for max values - iterating over cols_max.
+        for col in cols_max:
+            print(f"Getting player with most {col}...\n", player_index.get_leader(nhl_index, col), "\n")
+
+        # Eliminate players with insignificant shot totals from max. S% calculation.
+        df_significant_shots = df_nhl[df_nhl["S"] >= 100]
+        significant_shots_index = player_index.build_player_index(df_significant_shots, ["S%"])
+
+        # Extract player with max. S% (with minimum of 100 shots taken).
+        print("Getting player with highest S% (min. 100 shots)...\n",
+              player_index.get_leader(significant_shots_index, "S%"), "\n")
+
+        # Extract player with highest +/-.
+        print("Getting player with highest +/-...\n", player_index.get_leader(nhl_index, "+/-"), "\n")
+
+        # Extract player with lowest +/-.
+        print("Getting player with lowest +/-...\n", player_index.get_leader(nhl_index, "+/-", lowest=True), "\n")
+
+        # Extract other noteworthy players, by name - using for loop.
+        notable_players_1 = ["Mario Lemieux", "Mike Bossy", "Gordie Howe",
+                           "Sidney Crosby", "Evgeni Malkin",
+                           "Nicklas Lidstrom", "Erik Karlsson", "Cale Makar"]
+        for name in notable_players_1:
+            print(f"Getting player {name}...\n", player_index.get_player(nhl_index, name), "\n")
+
+        # Extract other noteworthy players, by name - using iter()/next().
+        # Same value required twice for print statement using iter()/next(). For loop preferred for this use case.
+        notable_players_2 = ["Connor McDavid", "Connor McDavid",
+                           "Auston Matthews", "Auston Matthews"]
+        notable_players_2_iter = iter(notable_players_2)
+        print(f"Getting player {next(notable_players_2_iter)}...\n",
+              player_index.get_player(nhl_index, next(notable_players_2_iter)), "\n")
+        print(f"Getting player {next(notable_players_2_iter)}...\n",
+              player_index.get_player(nhl_index, next(notable_players_2_iter)), "\n")
+
+        # Extract all notable players in a single batch lookup.
+        print("Getting notable players...\n", player_index.get_players(nhl_index, notable_players_1), "\n")
+        stage["rows_out"] = len(df_nhl)
 
     # Plot data for EDA.
-    # Set seaborn plot theme.
-    sns.set(rc={'figure.figsize': (16, 9)})
+    with profile_stages.profile_stage(profile, "plots", rows_in=len(df_nhl)):
 
-    # Run custom plotting functions.
-    get_pga_scatterplot(df_nhl)
-    get_p_pos_boxplot(df_nhl)
-    get_p_histogram(df_nhl)
+        # Set seaborn plot theme.
+        sns.set(rc={'figure.figsize': (16, 9)})
 
-    # Merging Dataframes
-    # Generating second data frame based on the 'Bio Info' report from NHL.com. Only the fist page is taken, sorted by
-    # P, G, A, for additional analysis on top 100 players in the df_nhl dataset.
-    df_bio_top_100 = get_dataset_excel("./Raw Data Files/", report="Bio Info")
-    print("Getting df_bio_top_100.head()...\n", df_bio_top_100.head(), "\n")
+        # Run custom plotting functions.
+        if SHOW_PLOTS:
+            get_pga_scatterplot(df_nhl)
+            get_p_pos_boxplot(df_nhl)
+            get_p_histogram(df_nhl)
+        else:
+            plot_futures = render_plots.render_plots_parallel(df_nhl, [get_pga_scatterplot, get_p_pos_boxplot,
+                                                                       get_p_histogram])
 
-    # Copy top 100 players (based on earlier sorting by P, G, A) from df_nhl into df_nhl_top_100.
-    df_nhl_top_100 = df_nhl.head(100)
+    # Merging Dataframes
+    with profile_stages.profile_stage(profile, "merge", rows_in=len(df_nhl)) as stage:
 
-    df_nhl_top_100_extended = pd.merge(df_nhl_top_100,
-                                       df_bio_top_100[["DOB", "Birth City", "S/P", "Ctry", "Ntnlty", "Ht", "Wt",
-                                                      "Draft Yr", "Round", "Overall", "1st Season", "HOF"]],
-                                       left_on=df_nhl_top_100["Player"],
-                                       right_on=df_bio_top_100["Player"])
+        # Generating second data frame from all pages of the 'Bio Info' report from NHL.com, parsed in parallel.
+        df_bio = get_dataset_excel("./Raw Data Files/", report="Bio Info", parallel=True)
+        print("Getting df_bio.head()...\n", df_bio.head(), "\n")
 
-    print("Getting df_nhl_top_100_extended.head()...\n", df_nhl_top_100_extended.head(), "\n")
+        # Join bio data onto all players, on a key of name, position and career totals - display names are not unique.
+        df_nhl_extended, unmatched = merge_bio.join_bio(df_nhl, merge_bio.build_bio_index(df_bio))
 
-    df_nhl_top_100_extended = df_nhl_top_100_extended.drop("key_0", axis=1)
+        print("Getting df_nhl_extended.head()...\n", df_nhl_extended.head(), "\n")
+        print("Getting players without bio data...\n", unmatched["nhl"][["Player", "Pos", "GP", "P"]].head(10), "\n")
 
-    print("Getting df_nhl_top_100_extended.describe(include='all'').T...\n",
-          df_nhl_top_100_extended.describe(include="all").T, "\n")
+        print("Getting df_nhl_extended.describe(include='all'').T for players with bio data...\n",
+              describe_dataset(df_nhl_extended.drop(unmatched["nhl"].index), include="all").T, "\n")
+        stage["rows_out"] = len(df_nhl_extended)
 
     # Machine Learning
-    # Define feature matrix X, and target (labels) y.
-    target = "G"
+    with profile_stages.profile_stage(profile, "dt", rows_in=len(df_nhl)):
+
+        # Define feature matrix X, and target (labels) y.
+        target = "G"
+
+        # Drop target from X.
+        X_all_features = df_nhl.drop(target, axis=1)
 
-    # Drop target from X.
-    X_all_features = df_nhl.drop(target, axis=1)
+        # Drop non-numeric features from X.
+        df_X_all_features = X_all_features.drop(["Player", "S/C", "Pos"], axis=1)
 
-    # Drop non-numeric features from X.
-    df_X_all_features = X_all_features.drop(["Player", "S/C", "Pos"], axis=1)
+        # Write DataFrame X, and Series y to the feature store as float32 arrays, and read them back memory-mapped.
+        # Models and their worker processes share the on-disk arrays, rather than each holding a float64 copy.
+        feature_store.write_feature_store(df_X_all_features, df_nhl[target].values, target)
+        X_all_features, y, feature_metadata = feature_store.load_feature_store(target)
 
-    # Convert DataFrame X, and Series y to numpy arrays.
-    X_all_features = df_X_all_features.values
-    y = df_nhl[target].values
+        # Create single-feature array for preliminary use.
+        X_single_feature = X_all_features[:, 4]
 
-    # Create single-feature array for preliminary use.
-    X_single_feature = X_all_features[:, 4]
+        print("Getting type(X_single_feature)...\n", type(X_single_feature), "\n")
+        print("Getting type(X_all_features)...\n", type(X_all_features), X_all_features.dtype, "\n")
+        print("Getting type(y)...\n", type(y), "\n")
 
-    print("Getting type(X_single_feature)...\n", type(X_single_feature), "\n")
-    print("Getting type(X_all_features)...\n", type(X_all_features), "\n")
-    print("Getting type(y)...\n", type(y), "\n")
+        # Reshape single feature to unknown number of rows, 1 column.
+        X_single_feature = X_single_feature.reshape(-1, 1)
 
-    # Reshape numpy arrays to unknown number of rows, 1 column.
-    y = y.reshape(-1, 1)
-    X_single_feature = X_single_feature.reshape(-1, 1)
+        # Share train/test split, CV folds and fitted models between all models. Fits are cached on disk, so re-running
+        # the pipeline does not refit identical models.
+        context = experiment_context.get_experiment_context(len(y), SEED, cache_dir="./Cache/Models/")
 
-    # Implement decision tree with single feature, and all features in feature matrix X.
-    implement_decision_tree(X_single_feature, y, SEED)
-    implement_decision_tree(X_all_features, y, SEED)
+        # Implement decision tree with single feature, and all features in feature matrix X.
+        implement_decision_tree(X_single_feature, y, SEED, context)
+        implement_decision_tree(X_all_features, y, SEED, context)
+
+        # Search feature subsets for the decision tree by forward selection, sharing CV folds between subsets.
+        dt = DecisionTreeRegressor(max_depth=4, min_samples_leaf=0.14, random_state=SEED)
+        df_subsets = search_feature_subsets(dt, X_all_features, y, df_X_all_features, SEED, mode="forward",
+                                            max_features=5, context=context)
+        print("Getting best feature subsets for decision tree...\n", df_subsets.head(10), "\n")
 
     # Implement ensembling with RandomForestRegressor. Dataframe Version of X, and target string are specified as
     # arguments for plotting purposes.
-    rf = implement_random_forest(X_all_features, y, SEED, df_X_all_features, target)
-
-    # Tune random forest hyperparameters.
-    rf_tuned = tune_random_forest(rf, X_all_features, y, SEED, df_X_all_features, target)
+    with profile_stages.profile_stage(profile, "rf", rows_in=len(y)):
+        rf = implement_random_forest(X_all_features, y, SEED, df_X_all_features, target, context, show=SHOW_PLOTS)
+
+    # Implement histogram-based gradient boosting, with early stopping, as a faster alternative to the random forest on
+    # larger datasets.
+    with profile_stages.profile_stage(profile, "hgb", rows_in=len(y)):
+        implement_gradient_boosting(X_all_features, y, SEED, df_X_all_features, target, context, show=SHOW_PLOTS)
+
+    # Tune random forest hyperparameters. Warm-started search evaluates the same grid as GridSearchCV, reusing trees
+    # across n_estimators values.
+    with profile_stages.profile_stage(profile, "tuning", rows_in=len(y)):
+        rf_tuned = tune_random_forest(rf, X_all_features, y, SEED, df_X_all_features, target, search="warm_start",
+                                      context=context, show=SHOW_PLOTS)
+
+        # Save tuned model with its feature schema, for predictions with model_service.py without retraining.
+        model_service.save_model(rf_tuned, df_X_all_features.columns, target,
+                                 f"./Models/Random Forest - {target}.joblib")
+
+    # Wait for plots rendered in worker processes.
+    if not SHOW_PLOTS:
+        render_plots.wait_for_plots(plot_futures)
+
+    # Write stage timings to file, to compare between runs.
+    profile_stages.write_profile_report(profile, "./Profiles/stage_report.json")
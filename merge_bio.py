@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+from check_for_duplicates import get_row_fingerprints
+from clean_dataset import parse_numeric, parse_text
+
+# Columns identifying a player in both the Summary and Bio Info reports, which carry no player ID. Career totals tell
+# apart players with the same name. S/C is not used, as it is imputed where missing in the cleaned Summary report.
+BIO_KEY_TEXT = ["Player", "Pos"]
+BIO_KEY_NUMERIC = ["GP", "G", "A", "P"]
+
+# Bio Info columns added to the Summary report by the join.
+BIO_COLUMNS = ["DOB", "Birth City", "S/P", "Ctry", "Ntnlty", "Ht", "Wt", "Draft Yr", "Round", "Overall", "1st Season",
+               "HOF"]
+
+
+def get_player_keys(df):
+    """Get a stable uint64 key per player, from the 'Player ID' column if present, or the composite key columns.
+
+    Key columns are normalised before hashing - text as strings, numbers parsed from the Excel format as float64 - so
+    a player has the same key in the raw and cleaned reports. Returns numpy array of keys, in row order.
+    """
+    if "Player ID" in df.columns:
+        return df["Player ID"].to_numpy(dtype="uint64")
+
+    df_key = pd.DataFrame({**{col: parse_text(df[col]).str.strip() for col in BIO_KEY_TEXT},
+                           **{col: parse_numeric(df[col]) for col in BIO_KEY_NUMERIC}})
+
+    return get_row_fingerprints(df_key)
+
+
+def build_bio_index(df_bio, bio_columns=None):
+    """Index the Bio Info report by player key, sorted, for joining with join_bio().
+
+    Players with more than one row for the same key are reported, and only the last row is kept. Returns DataFrame of
+    bio_columns (defaulting to BIO_COLUMNS), indexed by sorted player key.
+    """
+    if bio_columns is None:
+        bio_columns = BIO_COLUMNS
+
+    df_index = df_bio[bio_columns].set_axis(pd.Index(get_player_keys(df_bio), name="key"), axis=0)
+
+    duplicated = df_index.index.duplicated(keep="last")
+    if duplicated.any():
+        print(f"Dropping {duplicated.sum()} duplicate bio rows...\n", df_bio[duplicated], "\n")
+        df_index = df_index[~duplicated]
+
+    return df_index.sort_index()
+
+
+def join_bio(df_nhl, df_bio_index):
+    """Left join the Bio Info columns onto every player in df_nhl, on player key.
+
+    The join is a single hash join on the uint64 key, so its time grows linearly with the number of players. Players of
+    df_nhl without bio data, and bio rows matching no player, are reported. Returns joined DataFrame, in the row order
+    of df_nhl, and dict of unmatched keys - 'nhl' (DataFrame of players without bio) and 'bio' (array of bio keys).
+    """
+    keys = get_player_keys(df_nhl)
+    df_joined = df_nhl.join(df_bio_index.reindex(keys).set_axis(df_nhl.index, axis=0))
+
+    matched = np.isin(keys, df_bio_index.index.to_numpy())
+    unmatched = {"nhl": df_nhl[~matched],
+                 "bio": np.setdiff1d(df_bio_index.index.to_numpy(), keys, assume_unique=True)}
+
+    print(f"Players matched to bio data: {matched.sum()}, players without bio data: {len(unmatched['nhl'])}, bio rows "
+          f"without a player: {len(unmatched['bio'])}\n")
+
+    return df_joined, unmatched
+
+
+if __name__ == '__main__':
+    from get_dataset import get_dataset_excel
+    from clean_dataset import clean_dataset
+
+    directory = './Raw Data Files/'
+
+    df_nhl_test, null_count = clean_dataset(get_dataset_excel(directory))
+    df_nhl_test = df_nhl_test.sort_values(by=['P', 'G', 'A'], ascending=False).reset_index(drop=True)
+
+    df_bio_test = get_dataset_excel(directory, report="Bio Info", parallel=True)
+    df_nhl_extended, unmatched_test = join_bio(df_nhl_test, build_bio_index(df_bio_test))
+    print(df_nhl_extended.head(), "\n")
+
+    # Check against the merge on display name, for the top 100 players. Bio columns of integers are float in the full
+    # join, as players without bio data are NaN.
+    df_name_merge = pd.merge(df_nhl_test.head(100), df_bio_test[["Player"] + BIO_COLUMNS], on="Player")
+    print(df_name_merge.equals(df_nhl_extended.head(100).astype(df_name_merge.dtypes)), "\n")
+
+    # Players with the same display name are told apart.
+    print(df_nhl_test[df_nhl_test["Player"].duplicated(keep=False)].sort_values("Player").head(), "\n")
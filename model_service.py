@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds a request waits for its batch to be predicted, before the server answers 503.
+REQUEST_TIMEOUT = 30
+
+
+def save_model(model, feature_columns, target, model_file):
+    """Save fitted model to file, along with its feature schema (column names, in order) and target name."""
+    os.makedirs(os.path.dirname(model_file) or ".", exist_ok=True)
+
+    print(f"Saving model to {model_file}...\n")
+    joblib.dump({"model": model, "features": list(feature_columns), "target": target}, model_file)
+
+
+def load_model(model_file):
+    """Load model saved with save_model(). Returns dict of 'model', 'features' and 'target'."""
+    print(f"Loading model from {model_file}...\n")
+
+    return joblib.load(model_file)
+
+
+def predict_batch(model_bundle, df):
+    """Predict target for a DataFrame of players in a single vectorised call.
+
+    Takes model dict from load_model(), and DataFrame with (at least) the feature columns of the model. Returns numpy
+    array of predictions, in row order - empty for a DataFrame without rows.
+    """
+    missing = [col for col in model_bundle["features"] if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing feature columns: {missing}")
+
+    if df.empty:
+        return np.empty(0)
+
+    X = df[model_bundle["features"]].to_numpy(dtype="float64")
+
+    return model_bundle["model"].predict(X)
+
+
+def run_batcher(model_bundle, requests, max_batch_size=256, max_wait=0.005):
+    """Serve prediction requests from a queue in micro-batches.
+
+    Waits for a request, then collects further requests for up to max_wait seconds, or until max_batch_size player
+    rows are queued, and predicts all of them in one call. Each request is a dict holding a 'df' of players; the
+    predictions (or an error) are stored on the request, and its 'done' event is set. Any error in a batch is caught,
+    so that a bad request cannot stop the batcher thread.
+    """
+    while True:
+        batch = [requests.get()]
+        rows = len(batch[0]["df"])
+        deadline = time.perf_counter() + max_wait
+
+        while rows < max_batch_size:
+            try:
+                batch.append(requests.get(timeout=max(0.0, deadline - time.perf_counter())))
+            except queue.Empty:
+                break
+            rows += len(batch[-1]["df"])
+
+        try:
+            predictions = predict_batch(model_bundle, pd.concat([request["df"] for request in batch]))
+            start = 0
+            for request in batch:
+                request["predictions"] = predictions[start:start + len(request["df"])]
+                start += len(request["df"])
+        except Exception:
+            # Predict requests one by one, so that one bad request does not fail the batch.
+            for request in batch:
+                try:
+                    request["predictions"] = predict_batch(model_bundle, request["df"])
+                except Exception as request_error:
+                    request["error"] = str(request_error)
+
+        for request in batch:
+            request["done"].set()
+
+
+def get_request_handler(requests, timeout=REQUEST_TIMEOUT):
+    """Generate HTTP request handler class, queueing POST /predict requests for run_batcher().
+
+    Requests not predicted within timeout seconds are answered with 503.
+    """
+
+    class PredictionRequestHandler(BaseHTTPRequestHandler):
+        """Handle POST /predict with JSON body {"players": [{feature: value, ...}, ...]}."""
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self.send_error(404)
+                return
+
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                df = pd.DataFrame(body["players"])
+            except (ValueError, KeyError, TypeError):
+                self.send_error(400, "Expected JSON body {\"players\": [...]}")
+                return
+
+            request = {"df": df, "done": threading.Event()}
+            requests.put(request)
+            if not request["done"].wait(timeout):
+                self.send_error(503, "Prediction timed out")
+                return
+
+            if "error" in request:
+                self.send_error(400, request["error"])
+                return
+
+            response = json.dumps({"predictions": request["predictions"].tolist()}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+        def log_message(self, format, *args):
+            # Don't log every request to the terminal.
+            pass
+
+    return PredictionRequestHandler
+
+
+def serve(model_bundle, host="127.0.0.1", port=8000, max_batch_size=256, max_wait=0.005, timeout=REQUEST_TIMEOUT):
+    """Serve predictions over HTTP on host:port, micro-batching concurrent requests. Runs until interrupted."""
+    requests = queue.Queue()
+    threading.Thread(target=run_batcher, args=(model_bundle, requests, max_batch_size, max_wait), daemon=True).start()
+
+    server = ThreadingHTTPServer((host, port), get_request_handler(requests, timeout))
+    print(f"Serving {model_bundle['target']} predictions at http://{host}:{port}/predict...\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    """Command line interface - predict from a file of players, or serve predictions over HTTP.
+
+    Arguments are read from argv, or the command line if argv is None.
+    """
+    parser = argparse.ArgumentParser(description="Predict NHL player stats with a saved model.")
+    parser.add_argument("--model", default="./Models/Random Forest - G.joblib", help="model file from save_model()")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_predict = subparsers.add_parser("predict", help="predict for players in a .csv or .xlsx file")
+    parser_predict.add_argument("input", help="input file, with the model's feature columns")
+    parser_predict.add_argument("--output", help="output .csv file (printed if not given)")
+    parser_predict.add_argument("--batch-size", type=int, default=100000, help="rows predicted per call")
+
+    parser_serve = subparsers.add_parser("serve", help="serve predictions over HTTP")
+    parser_serve.add_argument("--host", default="127.0.0.1")
+    parser_serve.add_argument("--port", type=int, default=8000)
+    parser_serve.add_argument("--max-batch-size", type=int, default=256)
+    parser_serve.add_argument("--max-wait", type=float, default=0.005, help="seconds to wait to fill a batch")
+    parser_serve.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="seconds before answering 503")
+
+    args = parser.parse_args(argv)
+    model_bundle = load_model(args.model)
+
+    if args.command == "predict":
+        if args.input.endswith(".xlsx"):
+            df = pd.read_excel(args.input, engine="openpyxl")
+        else:
+            df = pd.read_csv(args.input)
+
+        # A file without rows is predicted as one empty batch, so its feature columns are still checked.
+        batches = range(0, len(df), args.batch_size) or [0]
+        predictions = np.concatenate([predict_batch(model_bundle, df.iloc[start:start + args.batch_size])
+                                      for start in batches])
+        df[f"{model_bundle['target']}_predicted"] = predictions
+
+        if args.output:
+            df.to_csv(args.output, index=False)
+        else:
+            print(df)
+    else:
+        serve(model_bundle, args.host, args.port, args.max_batch_size, args.max_wait, args.timeout)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main()
+    else:
+        # Smoke test - save a model, and predict for a file of players and for a file without rows.
+        import tempfile
+        from sklearn.tree import DecisionTreeRegressor
+
+        with tempfile.TemporaryDirectory() as test_dir:
+            df_test = pd.DataFrame({"GP": [82, 40, 10], "S": [300, 100, 20]})
+            model_file_test = os.path.join(test_dir, "Decision Tree - G.joblib")
+            save_model(DecisionTreeRegressor(random_state=1).fit(df_test.values, [50, 20, 2]), df_test.columns, "G",
+                       model_file_test)
+
+            df_test.to_csv(os.path.join(test_dir, "players.csv"), index=False)
+            df_test.iloc[[]].to_csv(os.path.join(test_dir, "empty.csv"), index=False)
+            for input_file in ["players.csv", "empty.csv"]:
+                main(["--model", model_file_test, "predict", os.path.join(test_dir, input_file)])
+                print()
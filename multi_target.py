@@ -0,0 +1,140 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from sklearn.tree import DecisionTreeRegressor
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from sklearn.metrics import mean_squared_error as MSE
+from threadpoolctl import threadpool_limits
+import experiment_context
+import feature_store
+
+# Targets trained by default in multi-target mode.
+TARGETS = ["G", "A", "P", "PPP", "GWG"]
+
+
+def share_array(array):
+    """Copy numpy array into a new block of shared memory. Returns SharedMemory block, to be closed and unlinked."""
+    shm = shared_memory.SharedMemory(create=True, size=array.nbytes)
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+
+    return shm
+
+
+def train_target(shm_name, shape, dtype, columns, target, SEED, n_threads=None):
+    """Train the decision tree, random forest and gradient boosting models for one target, in a worker process.
+
+    The shared matrix holds all numeric columns, and is read from shared memory rather than unpickled. The feature
+    matrix is every column but the target - the training and test sets are selected from the shared matrix directly,
+    so the worker holds no copy of the whole matrix besides them. Native thread pools - the OpenMP threads of gradient
+    boosting - are limited to n_threads, so concurrent workers don't oversubscribe the CPUs (not limited if None).
+    Returns dict of target, test RMSE per model, and random forest feature importances.
+    """
+    target_col = columns.index(target)
+    features = [col for col in columns if col != target]
+    feature_cols = [columns.index(col) for col in features]
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        data = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        context = experiment_context.get_experiment_context(shape[0], SEED)
+
+        # Rows and feature columns of each set are selected in one step, as the split is shuffled.
+        X_train = data[np.ix_(context["train"], feature_cols)]
+        X_test = data[np.ix_(context["test"], feature_cols)]
+        y_train, y_test = data[context["train"], target_col], data[context["test"], target_col]
+
+        result = {"target": target}
+        models = {"dt": DecisionTreeRegressor(max_depth=4, min_samples_leaf=0.14, random_state=SEED),
+                  "rf": RandomForestRegressor(n_estimators=400, min_samples_leaf=0.12, random_state=SEED),
+                  "hgb": HistGradientBoostingRegressor(max_iter=1000, early_stopping=True, n_iter_no_change=20,
+                                                       random_state=SEED)}
+        with threadpool_limits(limits=n_threads):
+            for name, model in models.items():
+                model.fit(X_train, y_train)
+                result[f"RMSE_test_{name}"] = MSE(y_test, model.predict(X_test)) ** (1 / 2)
+    finally:
+        # Views into the block must be released before it is closed.
+        data = None
+        shm.close()
+
+    result["importances"] = pd.Series(models["rf"].feature_importances_, index=features)
+
+    return result
+
+
+def train_targets_parallel(df_X, targets=None, SEED=1, max_workers=None, store_dir="./Cache/Features/"):
+    """Train models for several targets concurrently, in worker processes.
+
+    All numeric columns of df_X (features and targets) are written to a float32 feature store, with
+    feature_store.write_feature_store(), and copied once from the store into a shared memory block, so workers read
+    the same array instead of each receiving a pickled copy. Each target is trained with train_target(),
+    with the CPUs shared between the workers' thread pools.
+    Returns DataFrame of test RMSE per target and model, and DataFrame of random forest feature importances per
+    feature and target.
+    :param df_X: DataFrame of numeric columns, including the targets
+    :param targets: list of target column names, defaulting to TARGETS
+    :param SEED: seed for random number generation
+    :param max_workers: number of worker processes (defaults to the number of CPUs)
+    :param store_dir: directory of the feature store
+    :return: RMSE DataFrame, importances DataFrame
+    """
+    if targets is None:
+        targets = TARGETS
+
+    n_cpus = os.cpu_count() or 1
+    n_workers = min(max_workers or n_cpus, len(targets))
+    n_threads = max(1, n_cpus // n_workers)
+
+    feature_store.write_feature_store(df_X, None, "Multi-target", store_dir)
+    data, _, metadata = feature_store.load_feature_store("Multi-target", store_dir)
+    columns = metadata["columns"]
+
+    print(f"Training models for {len(targets)} targets in worker processes...\n")
+    shm = share_array(data)
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(train_target, [shm.name] * len(targets), [data.shape] * len(targets),
+                                        [str(data.dtype)] * len(targets), [columns] * len(targets), targets,
+                                        [SEED] * len(targets), [n_threads] * len(targets)))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    df_rmse = pd.DataFrame([{key: value for key, value in result.items() if key != "importances"}
+                            for result in results]).set_index("target")
+    df_importances = pd.DataFrame({result["target"]: result["importances"] for result in results}).reindex(columns)
+
+    return df_rmse, df_importances
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(1)
+    n_players = 5000
+    games_played = rng.integers(1, 1800, n_players)
+    goals = rng.binomial(games_played, 0.2)
+    assists = rng.binomial(games_played, 0.3)
+    df_test = pd.DataFrame({"GP": games_played,
+                            "G": goals,
+                            "A": assists,
+                            "P": goals + assists,
+                            "PPP": rng.binomial(goals + assists, 0.3),
+                            "GWG": rng.binomial(goals, 0.15),
+                            "PIM": rng.binomial(games_played, 0.8)})
+
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as test_dir:
+        rmse_test, importances_test = train_targets_parallel(df_test, store_dir=test_dir)
+        print("Getting RMSE per target...\n", rmse_test, "\n")
+        print("Getting feature importances per target...\n", importances_test, "\n")
+
+        # Workers read the same values as a single-process run.
+        data_test, _, _ = feature_store.load_feature_store("Multi-target", test_dir)
+        shm_test = share_array(data_test)
+        result_test = train_target(shm_test.name, data_test.shape, "float32", list(df_test.columns), "G", 1)
+        del data_test
+        shm_test.close()
+        shm_test.unlink()
+        print(np.isclose(result_test["RMSE_test_rf"], rmse_test.loc["G", "RMSE_test_rf"]))
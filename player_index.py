@@ -0,0 +1,105 @@
+import pandas as pd
+import numpy as np
+
+
+def build_player_index(df, stat_cols, k=10):
+    """Build an index of a player DataFrame for repeated lookups by name and by stat leader.
+
+    Takes DataFrame, list of numeric columns to index, and number of top players to store per column. Returns dict
+    holding the DataFrame, a hash index of player name to row positions, and per-column row positions of the max,
+    min and top-k values. Ties for max and min are kept, matching a df.loc[df[col] == max(df[col])] scan. Missing
+    values are skipped, as by pandas max() and min(), and columns with no values index no players.
+    :param df: player DataFrame, with 'Player' column
+    :param stat_cols: list of column names
+    :param k: number of top players stored per column
+    :return: player index dict
+    """
+    print(f"Building player index on {len(stat_cols)} columns...\n")
+    index = {"df": df,
+             "names": df.groupby("Player", sort=False, observed=True).indices,
+             "max": {},
+             "min": {},
+             "top_k": {}}
+
+    for col in stat_cols:
+        values = df[col].to_numpy(dtype="float64", na_value=np.nan)
+        valid = np.flatnonzero(~np.isnan(values))
+        if not len(valid):
+            index["max"][col] = index["min"][col] = index["top_k"][col] = valid
+            continue
+
+        values = values[valid]
+        index["max"][col] = valid[values == values.max()]
+        index["min"][col] = valid[values == values.min()]
+
+        # Partition for the k largest values, then sort only those k.
+        if k < len(values):
+            top_k = np.argpartition(-values, max(k, 1) - 1)[:k]
+        else:
+            top_k = np.arange(len(values))
+        index["top_k"][col] = valid[top_k[np.argsort(-values[top_k], kind="stable")]]
+
+    return index
+
+
+def get_player(index, name):
+    """Get DataFrame rows for player name. Returns empty DataFrame if name is not found."""
+    positions = index["names"].get(name, [])
+
+    return index["df"].iloc[positions]
+
+
+def get_players(index, names):
+    """Get DataFrame rows for a list of player names in a single lookup.
+
+    Rows are returned in order of names. Names not found are printed, and skipped.
+    """
+    found = [index["names"][name] for name in names if name in index["names"]]
+    missing = [name for name in names if name not in index["names"]]
+
+    if missing:
+        print(f"Players not found: {missing}\n")
+
+    if not found:
+        return index["df"].iloc[[]]
+
+    return index["df"].iloc[np.concatenate(found)]
+
+
+def get_leader(index, col, lowest=False):
+    """Get DataFrame rows of the player(s) with the highest value in col, or lowest if lowest is True."""
+    if lowest:
+        return index["df"].iloc[index["min"][col]]
+
+    return index["df"].iloc[index["max"][col]]
+
+
+def get_top_k(index, col, k=None):
+    """Get DataFrame rows of the top k players in col, sorted descending. Defaults to all stored players."""
+    return index["df"].iloc[index["top_k"][col][:k]]
+
+
+if __name__ == '__main__':
+    df_test = pd.DataFrame({"Player": ["A", "B", "C", "D", "B"],
+                            "G": [5, 9, 9, 1, 3],
+                            "+/-": [2, -4, 0, 7, 1]})
+
+    index_test = build_player_index(df_test, ["G", "+/-"], k=3)
+
+    print(get_player(index_test, "B"))
+    print(get_player(index_test, "E"))
+    print(get_players(index_test, ["D", "E", "A"]))
+    print(get_leader(index_test, "G"))
+    print(get_leader(index_test, "+/-", lowest=True))
+    print(get_top_k(index_test, "G"))
+    print(get_top_k(index_test, "+/-", k=2))
+
+    # Missing values are skipped, and k may exceed the number of players.
+    df_missing = pd.DataFrame({"Player": ["A", "B", "C"], "S%": [np.nan, 12.5, 8.0], "FOW%": [np.nan] * 3})
+    index_missing = build_player_index(df_missing, ["S%", "FOW%"], k=10)
+    print(get_leader(index_missing, "S%", lowest=True))
+    print(get_top_k(index_missing, "S%"))
+    print(get_leader(index_missing, "FOW%"))
+
+    index_empty = build_player_index(df_missing.iloc[[]], ["S%"])
+    print(get_top_k(index_empty, "S%"))
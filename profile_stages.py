@@ -0,0 +1,142 @@
+import cProfile
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:     # Not available on Windows - peak RSS is not recorded.
+    resource = None
+
+
+def get_peak_rss_mb():
+    """Get peak resident set size of this process and its finished child processes so far, in MB.
+
+    This is the peak over the lifetime of the process, not of a single stage. None if unavailable.
+    """
+    if resource is None:
+        return None
+
+    peak_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+    # ru_maxrss is in bytes on macOS, and kilobytes on Linux.
+    if sys.platform == "darwin":
+        return peak_rss / 1024 ** 2
+
+    return peak_rss / 1024
+
+
+def start_profile(cprofile_dir=None):
+    """Start profiling a pipeline.
+
+    If cprofile_dir is given, each stage is also run under cProfile, and its stats saved to <cprofile_dir>/<stage>.prof.
+    Returns profile dict, to be passed to start_stage() and end_stage().
+    """
+    if cprofile_dir is not None:
+        os.makedirs(cprofile_dir, exist_ok=True)
+
+    return {"stages": [], "cprofile_dir": cprofile_dir, "start": time.perf_counter()}
+
+
+def start_stage(profile, name, rows_in=None):
+    """Start timing a pipeline stage. Returns stage dict, to be passed to end_stage()."""
+    stage = {"name": name,
+             "rows_in": rows_in,
+             "wall_start": time.perf_counter(),
+             "parent_cpu_start": time.process_time(),
+             "peak_rss_start": get_peak_rss_mb(),
+             "profiler": None}
+
+    if profile["cprofile_dir"] is not None:
+        stage["profiler"] = cProfile.Profile()
+        stage["profiler"].enable()
+
+    return stage
+
+
+def end_stage(profile, stage, rows_out=None):
+    """End timing a pipeline stage, and record wall time, CPU time, peak RSS and rows in/out to the profile.
+
+    CPU time is of this (parent) process only - time spent in joblib worker processes is not included. Peak RSS is
+    recorded as the process peak so far, and as the increase of the peak during the stage - stages that stay below an
+    earlier peak increase it by 0.
+    """
+    wall_time = time.perf_counter() - stage["wall_start"]
+    parent_cpu_time = time.process_time() - stage["parent_cpu_start"]
+    peak_rss = get_peak_rss_mb()
+
+    record = {"stage": stage["name"],
+              "wall_time_s": round(wall_time, 4),
+              "parent_cpu_time_s": round(parent_cpu_time, 4),
+              "peak_rss_so_far_mb": peak_rss,
+              "peak_rss_increase_mb": None if peak_rss is None else round(peak_rss - stage["peak_rss_start"], 4),
+              "rows_in": stage["rows_in"],
+              "rows_out": rows_out}
+
+    if stage["profiler"] is not None:
+        stage["profiler"].disable()
+        record["cprofile_file"] = os.path.join(profile["cprofile_dir"], f"{stage['name']}.prof")
+        stage["profiler"].dump_stats(record["cprofile_file"])
+
+    profile["stages"].append(record)
+    print(f"Stage {stage['name']} - wall time: {wall_time:.2f}s, parent process CPU time: {parent_cpu_time:.2f}s\n")
+
+
+@contextmanager
+def profile_stage(profile, name, rows_in=None):
+    """Time a pipeline stage run in a with block, with start_stage() and end_stage().
+
+    The stage dict is returned by the with statement - set its 'rows_out' in the block to record rows out. The stage is
+    ended, with cProfile disabled and the stage recorded, even if the block raises.
+    """
+    stage = start_stage(profile, name, rows_in)
+    try:
+        yield stage
+    finally:
+        end_stage(profile, stage, stage.get("rows_out"))
+
+
+def write_profile_report(profile, report_file):
+    """Write profile of all stages to JSON file, with total wall time. Returns report dict."""
+    report = {"total_wall_time_s": round(time.perf_counter() - profile["start"], 4),
+              "stages": profile["stages"]}
+
+    os.makedirs(os.path.dirname(report_file) or ".", exist_ok=True)
+    with open(report_file, "w") as out_file:
+        json.dump(report, out_file, indent=2)
+
+    print(f"Writing stage profile report to {report_file}...\n")
+
+    return report
+
+
+if __name__ == '__main__':
+    profile_test = start_profile("./test_profiles")
+
+    stage_test = start_stage(profile_test, "sum", rows_in=1000000)
+    total = sum(range(1000000))
+    end_stage(profile_test, stage_test, rows_out=1)
+
+    stage_test = start_stage(profile_test, "allocate")
+    block = bytes(range(256)) * 200000
+    end_stage(profile_test, stage_test)
+    del block
+
+    with profile_stage(profile_test, "sleep"):
+        time.sleep(0.1)
+
+    # A stage that raises is still recorded, and its profiler disabled.
+    try:
+        with profile_stage(profile_test, "fail", rows_in=10) as stage_test:
+            raise ValueError("Stage failed")
+    except ValueError:
+        pass
+
+    print(json.dumps(write_profile_report(profile_test, "./test_profiles/report.json"), indent=2))
+
+    for file in os.listdir("./test_profiles"):
+        os.remove(os.path.join("./test_profiles", file))
+    os.rmdir("./test_profiles")
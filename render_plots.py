@@ -0,0 +1,69 @@
+import matplotlib
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait
+
+
+def render_plot(plot_function, df, rc):
+    """Render a plot function without display, in a worker process.
+
+    Selects the non-interactive Agg backend, applies seaborn theme rc, and calls plot_function(df, show=False). Returns
+    name of the plot function.
+    """
+    matplotlib.use("Agg")
+    import seaborn as sns
+
+    sns.set(rc=rc)
+    plot_function(df, show=False)
+
+    return plot_function.__name__
+
+
+def render_plots_parallel(df, plot_functions, rc=None, max_workers=None):
+    """Start rendering plots concurrently in worker processes, without blocking.
+
+    Takes DataFrame, list of plot functions accepting (df, show=False), seaborn theme rc, and number of worker processes
+    (defaults to the number of CPUs). Each plot is saved to file by its plot function. Returns list of futures, to be
+    passed to wait_for_plots().
+    """
+    if rc is None:
+        rc = {'figure.figsize': (16, 9)}
+
+    print(f"Rendering {len(plot_functions)} plots in worker processes...\n")
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    futures = [executor.submit(render_plot, plot_function, df, rc) for plot_function in plot_functions]
+
+    # Worker processes exit once the submitted plots are rendered.
+    executor.shutdown(wait=False)
+
+    return futures
+
+
+def wait_for_plots(futures):
+    """Wait for plots started with render_plots_parallel(), and print the plots rendered. Raises any plotting error."""
+    wait(futures)
+    for future in futures:
+        print(f"Rendered plot: {future.result()}")
+    print()
+
+
+if __name__ == '__main__':
+    from get_pga_scatterplot import get_pga_scatterplot
+    from get_p_pos_boxplot import get_p_pos_boxplot
+    from get_p_histogram import get_p_histogram
+
+    rng = np.random.default_rng(1)
+    n_players = 200000
+    games_played = rng.integers(1, 1800, n_players)
+    goals = rng.binomial(games_played, 0.2)
+    assists = rng.binomial(games_played, 0.3)
+    df_test = pd.DataFrame({"GP": games_played,
+                            "G": goals,
+                            "A": assists,
+                            "P": goals + assists,
+                            "Pos": rng.choice(["C", "L", "R", "D"], n_players),
+                            "S/C": rng.choice(["L", "R"], n_players)})
+
+    # Scatter plot falls back to hexbin above 100000 rows.
+    plot_futures = render_plots_parallel(df_test, [get_pga_scatterplot, get_p_pos_boxplot, get_p_histogram])
+    wait_for_plots(plot_futures)
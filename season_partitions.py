@@ -0,0 +1,215 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from get_dataset_api import STATS_API_URL, STATS_API_QUERY, SUMMARY_API_FIELDS, get_dataset_api
+
+# Career totals summed over seasons. Remaining Summary report columns are player attributes or derived ratios.
+SUMMARY_SUM_COLUMNS = ["GP", "G", "A", "P", "+/-", "PIM", "EVG", "EVP", "PPG", "PPP", "SHG", "SHP", "OTG", "GWG", "S"]
+
+# Player attributes, taken from the player's most recent season.
+SUMMARY_ATTRIBUTE_COLUMNS = ["Player", "S/C", "Pos"]
+
+
+def get_season_ids(season_from=19171918, season_to=20212022):
+    """Get stats API season IDs (e.g. 20212022 for 2021-22) from season_from to season_to, inclusive."""
+    return [year * 10000 + year + 1 for year in range(season_from // 10000, season_to // 10000 + 1)]
+
+
+def get_partition_path(partition_dir, season):
+    """Get path of the stored partition of a season."""
+    return os.path.join(partition_dir, f"Summary - {season}.pkl")
+
+
+def is_partition_complete(partition_dir, season):
+    """Check whether the stored partition of a season was fetched after the season ended.
+
+    Partitions without a record are treated as incomplete.
+    """
+    metadata_path = os.path.join(partition_dir, f"Summary - {season}.json")
+    if not os.path.exists(metadata_path):
+        return False
+
+    with open(metadata_path) as in_file:
+        return json.load(in_file)["complete"]
+
+
+def get_season_partition(season, source=STATS_API_URL, partition_dir="./Partitions/", refresh=False, **kwargs):
+    """Get the Summary report of a single season, from its stored partition, or from the stats API.
+
+    Partitions are fetched with get_dataset_api() (kwargs are passed through) and stored in partition_dir. If refresh
+    is True, the season is re-fetched without the response cache, for a season still in progress, and the partition
+    is recorded as incomplete. An incomplete partition is re-fetched the next time the season is requested without
+    refresh - once it is no longer the latest season - so its final data is stored. If source is a local directory, the
+    season is read from fixture files in its <season> subdirectory. Returns DataFrame with a 'Player ID' column, and the
+    'Season' column.
+    """
+    partition_path = get_partition_path(partition_dir, season)
+
+    if not refresh and os.path.exists(partition_path):
+        if is_partition_complete(partition_dir, season):
+            return pd.read_pickle(partition_path)
+
+        # Responses cached while the season was in progress are out of date.
+        print(f"Stored partition of season {season} is incomplete - re-fetching...\n")
+        kwargs["cache_dir"] = None
+
+    print(f"Ingesting season {season}...\n")
+    if os.path.isdir(source):
+        df_season = get_dataset_api(os.path.join(source, str(season)), keep_id=True, **kwargs)
+    else:
+        query = {**STATS_API_QUERY, "cayenneExp": f"gameTypeId=2 and seasonId={season}"}
+        if refresh:
+            kwargs["cache_dir"] = None
+        df_season = get_dataset_api(source, query=query, keep_id=True, **kwargs)
+
+    df_season["Season"] = season
+
+    os.makedirs(partition_dir, exist_ok=True)
+    df_season.to_pickle(partition_path)
+    with open(os.path.join(partition_dir, f"Summary - {season}.json"), "w") as out_file:
+        json.dump({"complete": not refresh}, out_file)
+
+    return df_season
+
+
+def merge_partition(df_aggregate, df_season):
+    """Merge a season partition into stored career aggregates, keyed on Player ID.
+
+    Sum columns are added, where recorded - seasons without a statistic (e.g. shots before 1959-60) don't count as 0.
+    Goals in seasons with shots recorded are also summed, as 'G (S)', so shooting percentage is computed over the same
+    seasons as shots. Attributes are taken from the latest season. Returns DataFrame of aggregates, indexed by Player
+    ID.
+    """
+    df_season = df_season.set_index("Player ID")
+    df_new = df_season[SUMMARY_SUM_COLUMNS].astype("float64")
+    df_new["G (S)"] = df_season["G"].where(df_season["S"].notna())
+
+    if df_aggregate is None:
+        df_sums = df_new
+        df_attributes = df_season[SUMMARY_ATTRIBUTE_COLUMNS + ["Season"]]
+    else:
+        df_sums = pd.concat([df_aggregate[df_new.columns], df_new]).groupby(level=0).sum(min_count=1)
+
+        # Later seasons overwrite the attributes of players already in the aggregates.
+        df_attributes = pd.concat([df_aggregate[SUMMARY_ATTRIBUTE_COLUMNS + ["Season"]],
+                                   df_season[SUMMARY_ATTRIBUTE_COLUMNS + ["Season"]]])
+        df_attributes = df_attributes.sort_values("Season", kind="stable")
+        df_attributes = df_attributes[~df_attributes.index.duplicated(keep="last")]
+
+    return df_sums.join(df_attributes)
+
+
+def get_career_totals(df_aggregate):
+    """Convert career aggregates to the Summary report, recomputing the derived ratios from the summed totals.
+
+    P/GP is P / GP, and S% is G / S x 100 over seasons with shots recorded, rather than imputed. TOI/GP and FOW% can
+    not be recomputed from the Summary report, and are left missing. Rows are sorted by points, goals and assists, as on
+    NHL.com. Returns DataFrame with the columns of the Excel export, in order, for clean_dataset().
+    """
+    df_nhl = df_aggregate.copy()
+
+    df_nhl["P/GP"] = (df_nhl["P"] / df_nhl["GP"]).round(2)
+    df_nhl["S%"] = (df_nhl["G (S)"] / df_nhl["S"].where(df_nhl["S"] > 0) * 100).round(1)
+    df_nhl["TOI/GP"] = np.nan
+    df_nhl["FOW%"] = np.nan
+
+    df_nhl = df_nhl.sort_values(["P", "G", "A"], ascending=False, kind="stable")
+
+    return df_nhl[list(SUMMARY_API_FIELDS.values())].reset_index(drop=True)
+
+
+def refresh_career_totals(seasons, source=STATS_API_URL, partition_dir="./Partitions/", **kwargs):
+    """Get all-time career totals for seasons, ingesting only the seasons not already merged into stored aggregates.
+
+    Aggregates of all seasons but the latest are stored in partition_dir, with the list of seasons merged. Seasons
+    not yet merged are ingested and merged into the stored aggregates, and the latest season, which may still be in
+    progress, is re-fetched on every refresh and merged on top. A season stored while it was the latest is re-fetched
+    when it is first merged into the aggregates, by get_season_partition(). Returns DataFrame of career totals, as
+    get_career_totals().
+    """
+    aggregate_path = os.path.join(partition_dir, "Summary - aggregate.pkl")
+    seasons_path = os.path.join(partition_dir, "Summary - aggregate seasons.json")
+
+    df_aggregate = None
+    merged_seasons = []
+    if os.path.exists(aggregate_path) and os.path.exists(seasons_path):
+        with open(seasons_path) as in_file:
+            merged_seasons = json.load(in_file)
+
+        # Rebuild if the stored aggregates include seasons no longer requested.
+        if set(merged_seasons) <= set(seasons[:-1]):
+            df_aggregate = pd.read_pickle(aggregate_path)
+        else:
+            merged_seasons = []
+
+    new_seasons = [season for season in seasons[:-1] if season not in merged_seasons]
+    print(f"Seasons in stored aggregates: {len(merged_seasons)}, seasons to merge: {len(new_seasons)}\n")
+
+    for season in new_seasons:
+        df_aggregate = merge_partition(df_aggregate, get_season_partition(season, source, partition_dir, **kwargs))
+        merged_seasons.append(season)
+
+    if new_seasons:
+        print(f"Saving aggregates of {len(merged_seasons)} seasons to {aggregate_path}...\n")
+        df_aggregate.to_pickle(aggregate_path)
+        with open(seasons_path, "w") as out_file:
+            json.dump(merged_seasons, out_file)
+
+    df_latest = get_season_partition(seasons[-1], source, partition_dir, refresh=True, **kwargs)
+
+    return get_career_totals(merge_partition(df_aggregate, df_latest))
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    # Fixture seasons in the format of the stats API, for 300 players over 4 seasons.
+    rng = np.random.default_rng(1)
+    test_seasons = get_season_ids(20182019, 20212022)
+
+    with tempfile.TemporaryDirectory() as test_dir:
+        for test_season in test_seasons:
+            player_ids = np.sort(rng.choice(300, 200, replace=False))
+            games_played = rng.integers(1, 82, len(player_ids))
+            goals = rng.binomial(games_played, 0.2)
+            assists = rng.binomial(games_played, 0.3)
+            shots = goals + rng.poisson(games_played * 2)
+            records = [{"playerId": int(player_id), "skaterFullName": f"Player {player_id}", "shootsCatches": "L",
+                        "positionCode": "C", "gamesPlayed": int(gp), "goals": int(g), "assists": int(a),
+                        "points": int(g + a), "plusMinus": 0, "penaltyMinutes": 0, "pointsPerGame": (g + a) / gp,
+                        "evGoals": int(g), "evPoints": int(g + a), "ppGoals": 0, "ppPoints": 0, "shGoals": 0,
+                        "shPoints": 0, "otGoals": 0, "gameWinningGoals": 0, "shots": int(s),
+                        "shootingPct": g / s if s else None, "timeOnIcePerGame": 1000.0, "faceoffWinPct": None}
+                       for player_id, gp, g, a, s in zip(player_ids, games_played, goals, assists, shots)]
+
+            os.makedirs(os.path.join(test_dir, "fixtures", str(test_season)))
+            with open(os.path.join(test_dir, "fixtures", str(test_season), "Summary-00.json"), "w") as out_file:
+                json.dump({"data": records, "total": len(records)}, out_file)
+
+        fixture_dir = os.path.join(test_dir, "fixtures")
+        partition_test_dir = os.path.join(test_dir, "partitions")
+
+        # First 3 seasons, then refresh with the 4th - only the 3rd and 4th seasons are ingested.
+        refresh_career_totals(test_seasons[:3], fixture_dir, partition_test_dir)
+
+        # The 3rd season ends after the first refresh - its final data has an extra goal for every player.
+        fixture_file = os.path.join(fixture_dir, str(test_seasons[2]), "Summary-00.json")
+        with open(fixture_file) as in_file:
+            page = json.load(in_file)
+        for record in page["data"]:
+            record["goals"] += 1
+            record["points"] += 1
+        with open(fixture_file, "w") as out_file:
+            json.dump(page, out_file)
+
+        df_refreshed = refresh_career_totals(test_seasons, fixture_dir, partition_test_dir)
+        print(df_refreshed.head(10), "\n")
+
+        # Check against a full rebuild from the final data of all seasons at once.
+        df_all = pd.concat([get_dataset_api(os.path.join(fixture_dir, str(test_season)), keep_id=True)
+                            for test_season in test_seasons])
+        df_sums = df_all.groupby("Player ID")[SUMMARY_SUM_COLUMNS].sum()
+        df_check = df_refreshed.set_index(df_refreshed["Player"].str.split().str[1].astype("int64")).sort_index()
+        print((df_check[SUMMARY_SUM_COLUMNS].to_numpy() == df_sums.to_numpy()).all())
+        print(np.allclose(df_check["S%"], (df_sums["G"] / df_sums["S"] * 100).round(1)), "\n")
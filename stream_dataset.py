@@ -0,0 +1,219 @@
+import pandas as pd
+import numpy as np
+from pandas.api.types import is_numeric_dtype
+from get_dataset import iter_dataset_excel
+from clean_dataset import clean_dataset
+from check_for_duplicates import get_row_fingerprints, is_fingerprint_in_shards, add_fingerprint_shard
+
+
+# Maximum number of values held per column for approximate quantiles. Below this size quantiles are exact.
+SAMPLE_SIZE = 10000
+
+QUANTILES = [0.25, 0.5, 0.75]
+
+
+def compress_sample(sample, weights, sample_size):
+    """Reduce a weighted sample to sample_size equally weighted values at evenly spaced quantiles."""
+    order = np.argsort(sample, kind="stable")
+    sample, weights = sample[order], weights[order]
+
+    total = weights.sum()
+    targets = (np.arange(sample_size) + 0.5) / sample_size * total
+    positions = np.searchsorted(np.cumsum(weights), targets)
+
+    return sample[positions], np.full(sample_size, total / sample_size)
+
+
+def get_column_summary(values, sample_size=SAMPLE_SIZE):
+    """Get mergeable summary of a numeric array - count, mean, sum of squared deviations, min, max, and sample."""
+    values = values[~np.isnan(values)]
+
+    col_summary = {"count": len(values),
+                   "mean": values.mean() if len(values) else 0.0,
+                   "m2": ((values - values.mean()) ** 2).sum() if len(values) else 0.0,
+                   "min": values.min() if len(values) else np.nan,
+                   "max": values.max() if len(values) else np.nan,
+                   "sample": values,
+                   "weights": np.ones(len(values))}
+
+    if len(values) > sample_size:
+        col_summary["sample"], col_summary["weights"] = compress_sample(values, col_summary["weights"], sample_size)
+
+    return col_summary
+
+
+def merge_column_summaries(summary_a, summary_b, sample_size=SAMPLE_SIZE):
+    """Merge two column summaries, as returned by get_column_summary(), into one.
+
+    Mean and variance are combined with the parallel algorithm of Chan et al., so the result matches a summary of the
+    combined values.
+    """
+    count = summary_a["count"] + summary_b["count"]
+    if summary_a["count"] == 0:
+        return summary_b
+    if summary_b["count"] == 0:
+        return summary_a
+
+    delta = summary_b["mean"] - summary_a["mean"]
+    m2 = summary_a["m2"] + summary_b["m2"] + delta ** 2 * summary_a["count"] * summary_b["count"] / count
+
+    col_summary = {"count": count,
+                   "mean": summary_a["mean"] + delta * summary_b["count"] / count,
+                   "m2": m2,
+                   "min": min(summary_a["min"], summary_b["min"]),
+                   "max": max(summary_a["max"], summary_b["max"]),
+                   "sample": np.concatenate([summary_a["sample"], summary_b["sample"]]),
+                   "weights": np.concatenate([summary_a["weights"], summary_b["weights"]])}
+
+    if len(col_summary["sample"]) > sample_size:
+        col_summary["sample"], col_summary["weights"] = compress_sample(col_summary["sample"], col_summary["weights"],
+                                                                        sample_size)
+
+    return col_summary
+
+
+def get_quantile(col_summary, q):
+    """Get quantile q of a column summary. Exact while the sample holds every value, approximate once compressed."""
+    if len(col_summary["sample"]) == col_summary["count"]:
+        return np.quantile(col_summary["sample"], q)
+
+    order = np.argsort(col_summary["sample"], kind="stable")
+    cumulative_weights = np.cumsum(col_summary["weights"][order])
+    position = np.searchsorted(cumulative_weights, q * cumulative_weights[-1])
+
+    return col_summary["sample"][order][min(position, len(order) - 1)]
+
+
+def get_quantiles(col_summary, qs):
+    """Get list of quantiles qs of a column summary, as get_quantile(), sorting or partitioning the sample once."""
+    if len(col_summary["sample"]) == col_summary["count"]:
+        return list(np.quantile(col_summary["sample"], qs))
+
+    return [get_quantile(col_summary, q) for q in qs]
+
+
+def update_summary(summary, df_chunk, sample_size=SAMPLE_SIZE):
+    """Merge summaries of the numeric columns of a DataFrame chunk into a dict of column summaries."""
+    for col in df_chunk.columns:
+        if not is_numeric_dtype(df_chunk[col]):
+            continue
+
+        chunk_summary = get_column_summary(df_chunk[col].to_numpy(dtype="float64"), sample_size)
+
+        if col in summary:
+            summary[col] = merge_column_summaries(summary[col], chunk_summary, sample_size)
+        else:
+            summary[col] = chunk_summary
+
+    return summary
+
+
+def describe_summary(summary):
+    """Generate a DataFrame in the format of df.describe() from a dict of column summaries."""
+    df_describe = {}
+    for col, col_summary in summary.items():
+        count = col_summary["count"]
+        df_describe[col] = [count,
+                            col_summary["mean"] if count else np.nan,
+                            (col_summary["m2"] / (count - 1)) ** (1 / 2) if count > 1 else np.nan,
+                            col_summary["min"]] + \
+                           (get_quantiles(col_summary, QUANTILES) if count else [np.nan] * len(QUANTILES)) + \
+                           [col_summary["max"]]
+
+    return pd.DataFrame(df_describe, index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"])
+
+
+def update_leaders(leaders, df_chunk, cols, lowest=False):
+    """Update dict of column name to DataFrame rows holding the max (or min if lowest is True) value, with a chunk."""
+    for col in cols:
+        values = df_chunk[col]
+        if values.isnull().all():
+            continue
+
+        chunk_best = values.min() if lowest else values.max()
+        df_chunk_leaders = df_chunk[values == chunk_best]
+
+        if col not in leaders:
+            leaders[col] = df_chunk_leaders
+            continue
+
+        best = leaders[col][col].iloc[0]
+        if chunk_best == best:
+            leaders[col] = pd.concat([leaders[col], df_chunk_leaders])
+        elif (chunk_best < best) if lowest else (chunk_best > best):
+            leaders[col] = df_chunk_leaders
+
+    return leaders
+
+
+def summarise_dataset_streaming(chunks, cols_max, cols_min=None, sample_size=SAMPLE_SIZE):
+    """Summarise a dataset one chunk at a time, without holding the full dataset in memory.
+
+    Each chunk is cleaned without imputation, and merged into running summaries - null counts, describe() statistics,
+    rows holding max and min values, and duplicate rows (by row hash, across chunks).
+    :param chunks: iterable of raw DataFrame chunks, e.g. from iter_dataset_excel()
+    :param cols_max: list of columns to get max value rows for
+    :param cols_min: list of columns to get min value rows for
+    :param sample_size: maximum number of values held per column for quantiles
+    :return: describe() DataFrame, null count Series, dict of max rows, dict of min rows, DataFrame of duplicates
+    """
+    if cols_min is None:
+        cols_min = []
+
+    summary = {}
+    null_check = pd.Series(dtype="int64")
+    leaders_max = {}
+    leaders_min = {}
+    seen_shards = []
+    duplicates = []
+    rows = 0
+
+    for df_chunk in chunks:
+        df_chunk, chunk_null_check = clean_dataset(df_chunk, impute=False)
+        rows += len(df_chunk)
+
+        # Keep null counts in column order.
+        columns = null_check.index.append(chunk_null_check.index).unique()
+        null_check = null_check.add(chunk_null_check, fill_value=0).reindex(columns).astype("int64")
+
+        update_summary(summary, df_chunk, sample_size)
+        update_leaders(leaders_max, df_chunk, cols_max)
+        update_leaders(leaders_min, df_chunk, cols_min, lowest=True)
+
+        # Check rows against rows in this chunk, and in previous chunks - held as sorted shards, one per chunk.
+        hashes = get_row_fingerprints(df_chunk)
+        is_duplicate = pd.Series(hashes).duplicated().to_numpy() | is_fingerprint_in_shards(hashes, seen_shards)
+        duplicates.append(df_chunk[is_duplicate])
+        add_fingerprint_shard(seen_shards, hashes)
+
+    df_duplicates = pd.concat(duplicates) if duplicates else pd.DataFrame()
+
+    print(f"Rows summarised: {rows}\n")
+    print("Getting missing_count...\n", null_check, "\n")
+    print("Getting .describe()...\n", describe_summary(summary), "\n")
+    print("Getting duplicates...\n", df_duplicates, "\n")
+
+    return describe_summary(summary), null_check, leaders_max, leaders_min, df_duplicates
+
+
+if __name__ == '__main__':
+    # Check merged summaries against statistics of the combined values.
+    rng = np.random.default_rng(1)
+    values_a = rng.normal(50, 10, 30000)
+    values_b = rng.normal(80, 5, 20000)
+
+    merged = merge_column_summaries(get_column_summary(values_a), get_column_summary(values_b))
+    values = np.concatenate([values_a, values_b])
+    print(merged["mean"], values.mean())
+    print((merged["m2"] / (merged["count"] - 1)) ** (1 / 2), values.std(ddof=1))
+    print(get_quantile(merged, 0.5), np.quantile(values, 0.5))
+
+    # Summarise NHL dataset file by file.
+    cols_max_test = ["GP", "G", "A", "P"]
+    df_describe, null_count, players_max, players_min, df_dupes = summarise_dataset_streaming(
+        iter_dataset_excel("./Raw Data Files/"), cols_max_test, ["+/-"])
+
+    for col in cols_max_test:
+        print(f"Getting player with most {col}...\n", players_max[col], "\n")
+
+    print("Getting player with lowest +/-...\n", players_min["+/-"], "\n")
@@ -1,18 +1,298 @@
+import json
+import os
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_bool_dtype, is_integer_dtype, is_numeric_dtype
 
+# Frames with more rows than this are summarised approximately, unless approximate is set explicitly.
+APPROXIMATE_ROWS = 1000000
 
-def summarise_dataset(df):
-    """Get summary of pandas DataFrame object - .shape, .head(), .tail(), .describe(), .info()."""
-    print("Getting .shape...\n", df.shape, "\n")
-    print("Getting .head()...\n", df.head(), "\n")
-    print("Getting .tail()...\n", df.tail(), "\n")
-    print("Getting .describe()...\n", df.describe(), "\n")
-    print("Getting .info()...")     # Separating print statements for .info() as output conflicts when combined.
-    print(df.info(), "\n")
+# Rows sampled for approximate quantiles, and hashes kept by the approximate distinct count sketch.
+SAMPLE_SIZE = 10000
+DISTINCT_SKETCH_SIZE = 4096
+
+# Summary parts (describe, info) of recently summarised frames, by cache key. Oldest entries are dropped past
+# SUMMARY_CACHE_SIZE.
+SUMMARY_CACHE = {}
+SUMMARY_CACHE_SIZE = 16
+
+DESCRIBE_NUMERIC_ROWS = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+DESCRIBE_OTHER_ROWS = ["count", "unique", "top", "freq"]
+
+
+def get_cache_key(df):
+    """Get cache key of a DataFrame - its shape, columns, dtypes, and a hash of every row, with its index.
+
+    Any change to the frame's structure or values gives a new key. Hashing is vectorised, and takes a fraction of the
+    time of the statistics it saves recomputing.
+    """
+    row_hash = pd.util.hash_pandas_object(df, index=True).sum() if len(df) else 0
+
+    return df.shape, tuple(df.columns), tuple(str(dtype) for dtype in df.dtypes), int(row_hash)
+
+
+def get_cached(df, part, compute, approximate, refresh=False, frame_key=None):
+    """Get part of a frame's summary from SUMMARY_CACHE, or compute it with compute(df, approximate) and cache it.
+
+    Takes the frame's get_cache_key(), if already computed, as frame_key.
+    """
+    key = get_cache_key(df) if frame_key is None else frame_key, part, approximate
+    if refresh or key not in SUMMARY_CACHE:
+        SUMMARY_CACHE[key] = compute(df, approximate)
+        while len(SUMMARY_CACHE) > SUMMARY_CACHE_SIZE:
+            SUMMARY_CACHE.pop(next(iter(SUMMARY_CACHE)))
+
+    return SUMMARY_CACHE[key]
+
+
+def is_numeric_column(values):
+    """Check whether a column is described by numeric statistics, as in describe() - numeric, but not bool."""
+    return is_numeric_dtype(values) and not is_bool_dtype(values)
+
+
+def get_distinct_count(values, sketch_size=DISTINCT_SKETCH_SIZE):
+    """Estimate number of distinct values in an array, with a k-minimum-values sketch of value hashes.
+
+    The sketch keeps the sketch_size smallest distinct 64-bit hashes - if the kth smallest is h, about k / (h / 2**64)
+    distinct values were hashed. The count is exact when there are fewer distinct values than sketch_size.
+    """
+    hashes = pd.util.hash_array(np.asarray(values))
+    if len(hashes) <= sketch_size:
+        return len(np.unique(hashes))
+
+    # The smallest hashes include duplicates - widen the candidates until sketch_size distinct hashes are found.
+    n_candidates = sketch_size
+    while True:
+        smallest = np.unique(np.partition(hashes, n_candidates - 1)[:n_candidates])
+        if len(smallest) >= sketch_size or n_candidates == len(hashes):
+            break
+        n_candidates = min(2 * n_candidates, len(hashes))
+
+    if len(smallest) < sketch_size:
+        return len(smallest)
+
+    return int(round((sketch_size - 1) / (float(smallest[sketch_size - 1]) / 2 ** 64)))
+
+
+def get_numeric_distinct_count(values, integer, approximate):
+    """Count distinct non-null values of a numeric array.
+
+    Integers of a small range (counts, in this dataset) are counted exactly by bincount. Other values are counted by
+    hashing - exactly, or with get_distinct_count() if approximate.
+    """
+    if len(values) == 0:
+        return 0
+
+    if integer:
+        low, high = values.min(), values.max()
+        if high - low <= 4 * len(values):
+            return int(np.count_nonzero(np.bincount((values - low).astype("int64"))))
+
+    return get_distinct_count(values) if approximate else len(pd.unique(values))
+
+
+def describe_approximate(df, sample_size=SAMPLE_SIZE, SEED=1):
+    """Compute describe(include="all") statistics, with quantiles from a random sample of sample_size rows.
+
+    Count, mean, std, min and max are exact, from one stream_dataset.get_column_summary() per numeric column. Quantiles
+    are taken from the same sampled rows for all columns, as an equally weighted sample. Statistics of other columns
+    come from one value_counts() per column. Returns DataFrame in the layout of df.describe(include="all").
+    """
+    from stream_dataset import get_column_summary, describe_summary
+
+    sample_rows = np.sort(np.random.default_rng(SEED).choice(len(df), min(sample_size, len(df)), replace=False))
+
+    numeric_summaries = {}
+    other_describe = {}
+    for col in df.columns:
+        if is_numeric_column(df[col]):
+            values = df[col].to_numpy(dtype="float64", na_value=np.nan)
+            col_summary = get_column_summary(values, sample_size=len(values))
+            sample = values[sample_rows]
+            col_summary["sample"] = sample[~np.isnan(sample)]
+            col_summary["weights"] = np.full(len(col_summary["sample"]),
+                                             col_summary["count"] / max(len(col_summary["sample"]), 1))
+            numeric_summaries[col] = col_summary
+        else:
+            value_counts = df[col].value_counts()
+            value_counts = value_counts[value_counts > 0]
+            other_describe[col] = [int(value_counts.sum()), len(value_counts),
+                                   value_counts.index[0] if len(value_counts) else np.nan,
+                                   value_counts.iloc[0] if len(value_counts) else np.nan]
+
+    # describe(include="all") layout - statistics rows present for any column kind, columns in frame order.
+    rows = DESCRIBE_OTHER_ROWS if other_describe else []
+    if numeric_summaries:
+        rows = rows + [row for row in DESCRIBE_NUMERIC_ROWS if row not in rows]
+    df_describe = pd.concat([describe_summary(numeric_summaries) if numeric_summaries else pd.DataFrame(),
+                             pd.DataFrame(other_describe, index=DESCRIBE_OTHER_ROWS, dtype="object")], axis=1)
+
+    return df_describe.reindex(index=rows, columns=df.columns)
+
+
+def compute_describe(df, approximate):
+    """Compute describe(include="all") statistics - with pandas if exact, or describe_approximate()."""
+    return describe_approximate(df) if approximate else df.describe(include="all")
+
+
+def compute_info(df, approximate):
+    """Compute per-column info - non-null count, distinct count and dtype. Returns DataFrame, one row per column.
+
+    Distinct counts of non-numeric columns are taken from the cached describe() statistics.
+    """
+    df_describe = get_cached(df, "describe", compute_describe, approximate)
+
+    info = {}
+    for col in df.columns:
+        values = df[col]
+        if is_numeric_column(values):
+            values_non_null = values.dropna().to_numpy()
+            distinct = get_numeric_distinct_count(values_non_null, is_integer_dtype(values), approximate)
+        else:
+            distinct = int(df_describe.loc["unique", col])
+
+        info[col] = {"Non-Null Count": int(values.count()), "Distinct": distinct, "Dtype": str(values.dtype)}
+
+    return pd.DataFrame.from_dict(info, orient="index")
+
+
+def get_summary(df, approximate=None, refresh=False):
+    """Get summary of every column of a DataFrame - the content of .shape, .head(), .tail(), .describe(include="all")
+    and .info(), computed once and cached.
+
+    Statistics are cached under get_cache_key(), and returned from cache until the frame changes, so repeated
+    summaries and describe_dataset() calls do not recompute them.
+    :param df: DataFrame object
+    :param approximate: if True, quantiles are taken from a random sample of SAMPLE_SIZE rows, and numeric distinct
+    counts from a hash sketch - exact otherwise. Defaults to True for frames of more than APPROXIMATE_ROWS rows
+    :param refresh: if True, statistics are recomputed, rather than returned from cache
+    :return: summary dict - shape, head, tail, describe (DataFrame), info (DataFrame), memory_usage, approximate
+    """
+    if approximate is None:
+        approximate = len(df) > APPROXIMATE_ROWS
+
+    frame_key = get_cache_key(df)
+
+    return {"shape": df.shape,
+            "head": df.head(),
+            "tail": df.tail(),
+            "describe": get_cached(df, "describe", compute_describe, approximate, refresh, frame_key),
+            "info": get_cached(df, "info", compute_info, approximate, refresh, frame_key),
+            "memory_usage": int(df.memory_usage().sum()),
+            "approximate": approximate}
+
+
+def describe_dataset(df, include=None, approximate=None, refresh=False):
+    """Get describe() statistics of a DataFrame, as df.describe(include=include), cached as in get_summary().
+
+    With include="all", all columns are described. Otherwise numeric columns only, or all columns if there are none.
+    Only the describe() statistics are computed - not the rest of the summary.
+    """
+    if approximate is None:
+        approximate = len(df) > APPROXIMATE_ROWS
+
+    df_describe = get_cached(df, "describe", compute_describe, approximate, refresh)
+    if include == "all":
+        return df_describe
+
+    numeric_cols = [col for col in df.columns if is_numeric_column(df[col])]
+    if numeric_cols:
+        return df_describe.loc[DESCRIBE_NUMERIC_ROWS, numeric_cols].astype("float64")
+
+    return df_describe.loc[DESCRIBE_OTHER_ROWS]
+
+
+def write_summary(summary, output_file):
+    """Write summary from get_summary() to a .json or .html file.
+
+    JSON holds shape, per-column info, describe() statistics by column, and head and tail rows as records. HTML holds
+    the same as tables.
+    """
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    extension = os.path.splitext(output_file)[1].lower()
+    if extension == ".json":
+        report = {"shape": list(summary["shape"]),
+                  "memory_usage": summary["memory_usage"],
+                  "approximate": summary["approximate"],
+                  "info": json.loads(summary["info"].to_json(orient="index")),
+                  "describe": json.loads(summary["describe"].to_json(orient="columns")),
+                  "head": json.loads(summary["head"].to_json(orient="records")),
+                  "tail": json.loads(summary["tail"].to_json(orient="records"))}
+        with open(output_file, "w") as out_file:
+            json.dump(report, out_file, indent=2)
+    elif extension == ".html":
+        sections = [f"<h2>Shape</h2>\n<p>{summary['shape'][0]} rows, {summary['shape'][1]} columns"
+                    f"{' (approximate statistics)' if summary['approximate'] else ''}</p>",
+                    f"<h2>Info</h2>\n{summary['info'].to_html()}\n<p>Memory usage: {summary['memory_usage']} bytes</p>",
+                    f"<h2>Describe</h2>\n{summary['describe'].to_html(na_rep='')}",
+                    f"<h2>Head</h2>\n{summary['head'].to_html()}",
+                    f"<h2>Tail</h2>\n{summary['tail'].to_html()}"]
+        with open(output_file, "w") as out_file:
+            out_file.write("<html>\n<body>\n" + "\n".join(sections) + "\n</body>\n</html>\n")
+    else:
+        raise ValueError(f"Unknown summary output format: {output_file}")
+
+
+def summarise_dataset(df, approximate=None, output_file=None):
+    """Get summary of pandas DataFrame object - .shape, .head(), .tail(), .describe(), .info().
+
+    All statistics come from one cached get_summary() pass. If output_file is given, the summary is also written to
+    a .json or .html file. Returns summary dict.
+    """
+    summary = get_summary(df, approximate)
+
+    print("Getting .shape...\n", summary["shape"], "\n")
+    print("Getting .head()...\n", summary["head"], "\n")
+    print("Getting .tail()...\n", summary["tail"], "\n")
+    print(f"Getting .describe(){' (approximate)' if summary['approximate'] else ''}...\n",
+          describe_dataset(df, approximate=summary["approximate"]), "\n")
+    print("Getting .info()...\n", summary["info"], "\n")
+    print(f"Memory usage: {summary['memory_usage'] / 1024:.1f} KB\n")
+
+    if output_file is not None:
+        write_summary(summary, output_file)
+
+    return summary
 
 
 if __name__ == '__main__':
+    import tempfile
+    import time
+
     df_test = pd.DataFrame({"col_1": [1, 2, 3],
                             "col_2": ["a", "b", "c"]})
 
-    summarise_dataset(df_test)
\ No newline at end of file
+    summarise_dataset(df_test)
+
+    # Matches pandas describe(), exactly and approximately on a large frame.
+    rng = np.random.default_rng(1)
+    n_rows = 2000000
+    df_large = pd.DataFrame({"GP": rng.integers(1, 1800, n_rows),
+                             "P/GP": rng.random(n_rows),
+                             "Pos": pd.Categorical(rng.choice(["C", "D", "L", "R"], n_rows))})
+    df_large.loc[::7, "P/GP"] = np.nan
+
+    start = time.perf_counter()
+    df_pandas = df_large.describe(include="all")
+    print(f"pandas describe(): {time.perf_counter() - start:.2f}s")
+    for approximate_test in [False, True]:
+        for _ in range(2):
+            start = time.perf_counter()
+            df_fused = describe_dataset(df_large, include="all", approximate=approximate_test)
+            print(f"describe_dataset(approximate={approximate_test}): {time.perf_counter() - start:.2f}s")
+    print(df_pandas, "\n")
+    print(df_fused, "\n")
+    print(get_summary(df_large, approximate=True)["info"], "\n")
+
+    # Modified frame is summarised again - row 0 is always sampled for the cache key.
+    df_large.loc[0, "GP"] = 5000
+    print(describe_dataset(df_large, approximate=False).loc["max", "GP"], "\n")
+
+    with tempfile.TemporaryDirectory() as test_dir:
+        for output_test in ["summary.json", "summary.html"]:
+            write_summary(get_summary(df_test), os.path.join(test_dir, output_test))
+            with open(os.path.join(test_dir, output_test)) as in_file:
+                print(in_file.read()[:300], "\n")
@@ -1,50 +1,193 @@
-from sklearn.model_selection import train_test_split
 import numpy as np
 from sklearn.metrics import mean_squared_error as MSE
 import pandas as pd
 from sklearn.model_selection import GridSearchCV
+from sklearn.model_selection import RandomizedSearchCV
+from sklearn.model_selection import ParameterGrid
+from sklearn.model_selection import KFold
+from sklearn.experimental import enable_halving_search_cv  # noqa
+from sklearn.model_selection import HalvingGridSearchCV
+from sklearn.base import clone
+from joblib import Parallel, delayed, effective_n_jobs
+import time
 import matplotlib.pyplot as plt
 import seaborn as sns
+import experiment_context
+import feature_importance
 
-def tune_random_forest(rf, X, y, SEED, df_X, target):
+# Hyperparameter grid for tuning.
+PARAMS_RF = {'n_estimators': [300, 400, 500],
+             'max_depth': [4, 6, 8],
+             'min_samples_leaf': [0.1, 0.2],
+             'max_features': ['log2', 'sqrt']}
+
+
+def fit_warm_start_fold(rf, params, n_estimators_list, X_train, y_train, train, test):
+    """Fit RandomForestRegressor on one CV fold with increasing n_estimators, adding trees to the same forest.
+
+    The fold's training and test rows are selected once, and reused for every value of n_estimators. Returns list of
+    fold test MSE for each value of n_estimators.
+    """
+    X_fold_train, y_fold_train = X_train[train], y_train[train]
+    X_fold_test, y_fold_test = X_train[test], y_train[test]
+
+    model = clone(rf).set_params(warm_start=True, **params)
+    mse_fold = []
+    for n_estimators in n_estimators_list:
+        model.set_params(n_estimators=n_estimators)
+        model.fit(X_fold_train, y_fold_train)
+        mse_fold.append(MSE(y_fold_test, model.predict(X_fold_test)))
+
+    return mse_fold
+
+
+def warm_start_search(rf, params_rf, X_train, y_train, cv=3, time_budget=None, folds=None):
+    """Grid search of RandomForestRegressor hyperparameters, growing forests incrementally over n_estimators.
+
+    For each combination of the other hyperparameters, and each CV fold, one forest is grown to each value of
+    n_estimators in turn with warm_start, so the 400-tree candidate reuses the trees of the 300-tree candidate. With a
+    fixed random_state, the forests are identical to forests fitted from zero. Combinations are evaluated in parallel,
+    in batches of one combination per CPU, until the time budget (seconds) is spent. The budget is checked between
+    batches, and the first batch is always evaluated - so with no more combinations than CPUs, the whole grid is
+    evaluated whatever the budget. Folds default to unshuffled K-folds, as GridSearchCV.
+    :return: best hyperparameters, dict; cv results, DataFrame; trees grown, int
+    """
+    if time_budget is not None and time_budget <= 0:
+        raise ValueError(f"time_budget must be positive, got {time_budget}")
+
+    n_estimators_list = sorted(params_rf['n_estimators'])
+    other_params = list(ParameterGrid({key: value for key, value in params_rf.items() if key != 'n_estimators'}))
+    if folds is None:
+        folds = list(KFold(n_splits=cv).split(X_train))
+
+    results = []
+    trees_grown = 0
+    start = time.perf_counter()
+    with Parallel(n_jobs=-1) as parallel:
+        batch_size = effective_n_jobs(-1)
+        for i in range(0, len(other_params), batch_size):
+            if i > 0 and time_budget is not None and time.perf_counter() - start > time_budget:
+                print(f"Time budget of {time_budget}s spent - evaluated {i} of {len(other_params)} combinations...\n")
+                break
+
+            batch = other_params[i:i + batch_size]
+            mse_folds = parallel(delayed(fit_warm_start_fold)(rf, params, n_estimators_list, X_train, y_train,
+                                                              train, test)
+                                 for params in batch for train, test in folds)
+            trees_grown += max(n_estimators_list) * len(mse_folds)
+
+            for j, params in enumerate(batch):
+                mse_params = np.mean(mse_folds[j * len(folds):(j + 1) * len(folds)], axis=0)
+                for n_estimators, mse in zip(n_estimators_list, mse_params):
+                    results.append({**params, 'n_estimators': n_estimators, 'mean_test_mse': mse})
+
+    cv_results = pd.DataFrame(results).sort_values('mean_test_mse')
+    best_hyperparams = min(results, key=lambda result: result['mean_test_mse']).copy()
+    del best_hyperparams['mean_test_mse']
+
+    return best_hyperparams, cv_results, trees_grown
+
+
+def tune_random_forest(rf, X, y, SEED, df_X, target, search="grid", n_iter=10, time_budget=None, context=None,
+                       show=True, importance="impurity"):
     """Perform hyperparameter tuning on a RnadomForestRegreesor model.
 
-    Takes below parameters as input. Tunes hyperparameters of model per GridSearchCV. Prints best parameters, and best
-    model. Predicts with the best model, and prints RMSE of prediction. Bar chart of feature importances is saved to
-    file and displayed on screen. Returns best model as determined by hyperparameter tuning with GridSearchCV.
+    Takes below parameters as input. Tunes hyperparameters of model per the search strategy. Prints best parameters,
+    and best model. Predicts with the best model, and prints RMSE of prediction. Bar chart of feature importances is
+    saved to file and displayed on screen. Returns best model as determined by hyperparameter tuning.
     :param rf: RandomForest Regressor model
     :param X: feature matrix, numpy ndarray
     :param y: target, numpy ndarray
     :param SEED: seed for random number generation
     :param df_X: X as pandas DataFrame object
     :param target: taget name, string
+    :param search: search strategy, string - 'grid' (GridSearchCV), 'halving' (HalvingGridSearchCV with n_estimators
+    as the resource), 'random' (RandomizedSearchCV of n_iter candidates) or 'warm_start' (warm_start_search())
+    :param n_iter: number of candidates for 'random' search
+    :param time_budget: time budget in seconds for 'warm_start' search, checked between batches of combinations
+    :param context: experiment context from experiment_context.get_experiment_context(), shared between models
+    :param show: if False, the plot is saved to file without display, and closed
+    :param importance: feature importance kind plotted - 'impurity', 'permutation' or 'attribution', computed on the
+    test set with feature_importance.get_importances_cached()
     :return: best RF Regressor model determined by hyperparameter tuning
     """
     # Hyperparameter tuning
     print("Getting RandomForestRegressor hyperparamters...\n", rf.get_params(), "\n")
 
-    print("Tuning hyperparameters with GridSearchCV...\n")
-    params_rf = {'n_estimators': [300, 400, 500],
-                 'max_depth': [4, 6, 8],
-                 'min_samples_leaf': [0.1, 0.2],
-                 'max_features': ['log2', 'sqrt']}
+    params_rf = PARAMS_RF
+    cv = 3
+
+    if context is None:
+        context = experiment_context.get_experiment_context(len(X), SEED)
 
-    grid_rf = GridSearchCV(estimator=rf,
-                           param_grid=params_rf,
-                           cv=3,
-                           scoring='neg_mean_squared_error',
-                           verbose=1,
-                           n_jobs=-1)
+    X_train, X_test, y_train, y_test = experiment_context.get_split(context, X, y)
+    y_train = np.ravel(y_train)
+    folds = experiment_context.get_folds(context, cv)
 
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=SEED)
+    # Trees grown by an exhaustive grid search, for comparison.
+    trees_grid = sum(params['n_estimators'] for params in ParameterGrid(params_rf)) * cv
 
-    grid_rf.fit(X_train, np.ravel(y_train))
+    start = time.perf_counter()
+    if search == "warm_start":
+        print("Tuning hyperparameters with warm-started grid search...\n")
+        best_hyperparams, cv_results, trees_grown = warm_start_search(rf, params_rf, X_train, y_train, cv,
+                                                                      time_budget, folds)
+        best_model = clone(rf).set_params(**best_hyperparams).fit(X_train, y_train)
+    else:
+        if search == "grid":
+            print("Tuning hyperparameters with GridSearchCV...\n")
+            search_rf = GridSearchCV(estimator=rf,
+                                     param_grid=params_rf,
+                                     cv=folds,
+                                     scoring='neg_mean_squared_error',
+                                     verbose=1,
+                                     n_jobs=-1)
+        elif search == "halving":
+            print("Tuning hyperparameters with HalvingGridSearchCV...\n")
+            search_rf = HalvingGridSearchCV(estimator=rf,
+                                            param_grid={key: value for key, value in params_rf.items()
+                                                        if key != 'n_estimators'},
+                                            resource='n_estimators',
+                                            max_resources=max(params_rf['n_estimators']),
+                                            min_resources='exhaust',
+                                            cv=folds,
+                                            scoring='neg_mean_squared_error',
+                                            random_state=SEED,
+                                            verbose=1,
+                                            n_jobs=-1)
+        elif search == "random":
+            print("Tuning hyperparameters with RandomizedSearchCV...\n")
+            search_rf = RandomizedSearchCV(estimator=rf,
+                                           param_distributions=params_rf,
+                                           n_iter=n_iter,
+                                           cv=folds,
+                                           scoring='neg_mean_squared_error',
+                                           random_state=SEED,
+                                           verbose=1,
+                                           n_jobs=-1)
+        else:
+            raise ValueError(f"Unknown search strategy: {search}")
+
+        search_rf.fit(X_train, y_train)
+
+        best_hyperparams = search_rf.best_params_
+        best_model = search_rf.best_estimator_
+
+        if search == "halving":
+            trees_grown = sum(n_candidates * n_resources * cv for n_candidates, n_resources
+                              in zip(search_rf.n_candidates_, search_rf.n_resources_))
+        else:
+            trees_grown = sum(search_rf.cv_results_['param_n_estimators']) * cv
+
+    search_time = time.perf_counter() - start
+
+    # Estimate full grid time, assuming time is proportional to trees grown.
+    print(f"Search time: {search_time:.1f}s, trees grown: {trees_grown} (full grid: {trees_grid})")
+    print(f"Estimated time saved compared with full grid: {search_time * (trees_grid / trees_grown - 1):.1f}s\n")
 
-    best_hyperparams = grid_rf.best_params_
     print('Getting best hyperparameters...\n', best_hyperparams, "\n")
 
-    # Extract the best model from 'grid_rf'
-    best_model = grid_rf.best_estimator_
+    # Extract the best model.
     print('Getting best model...\n', best_model, "\n")
 
     # Predict the test set labels.
@@ -58,14 +201,21 @@ def tune_random_forest(rf, X, y, SEED, df_X, target):
     print(f'RMSE_test_rf_tuned: {rmse_test_rf_tuned}', "\n")
 
     # Plot feature importances.
-    importances = pd.Series(data=best_model.feature_importances_,
+    importances = pd.Series(data=feature_importance.get_importances_cached(best_model, X_test, y_test, importance),
                             index=df_X.columns)
 
     importances_sorted = importances.sort_values()
 
+    title = f"Feature Importance in Prediction of {target} - Tuned Random Forest"
+    if importance != "impurity":
+        title += f" ({importance.capitalize()})"
+
     importances_sorted.plot(kind='barh')
-    plt.title(f"Feature Importance in Prediction of {target} - Tuned Random Forest")
-    plt.savefig(f"Feature Importance in Prediction of {target} - Tuned Random Forest")
-    plt.show()
+    plt.title(title)
+    plt.savefig(title)
+    if show:
+        plt.show()
+    else:
+        plt.close()
 
     return best_model